@@ -0,0 +1,74 @@
+"""
+HRP 加速比較：舊版 pandas 分群/二分法 vs NumPy 整數索引版本，並檢查權重完全相同。
+用法: python -m benchmarks.bench_hrp [--sizes 100 250 500 1000]
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from benchmarks.harness import timeit
+from benchmarks.synthetic import factor_returns
+from src.clustering import HierarchicalClustering
+from src.optimization import HRPOptimizer
+
+def _legacy_quasi_diag(link):
+    """舊版 pandas Series 的 quasi-diagonalization (僅供比較)"""
+    link = link.astype(int)
+    sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
+    num_items = link[-1, 3]
+    while sort_ix.max() >= num_items:
+        sort_ix.index = range(0, sort_ix.shape[0] * 2, 2)
+        df0 = sort_ix[sort_ix >= num_items]
+        i = df0.index
+        j = df0.values - num_items
+        sort_ix[i] = link[j, 0]
+        df0 = pd.Series(link[j, 1], index=i + 1)
+        sort_ix = pd.concat([sort_ix, df0])
+        sort_ix = sort_ix.sort_index()
+        sort_ix.index = range(sort_ix.shape[0])
+    return sort_ix.tolist()
+
+def _legacy_cluster_var(cov, c_items):
+    cov_slice = cov.loc[c_items, c_items]
+    ivp = 1 / np.diag(cov_slice)
+    ivp /= ivp.sum()
+    w = ivp.reshape(-1, 1)
+    return np.dot(np.dot(w.T, cov_slice), w)[0, 0]
+
+def _legacy_rec_bisection(cov, sort_ix):
+    """舊版以標籤查找的遞迴二分法 (僅供比較)"""
+    w = pd.Series(1.0, index=sort_ix)
+    c_items = [sort_ix]
+    while len(c_items) > 0:
+        c_items = [i[j:k] for i in c_items for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if len(i) > 1]
+        for i in range(0, len(c_items), 2):
+            c_var0 = _legacy_cluster_var(cov, c_items[i])
+            c_var1 = _legacy_cluster_var(cov, c_items[i + 1])
+            alpha = 1 - c_var0 / (c_var0 + c_var1)
+            w[c_items[i]] *= alpha
+            w[c_items[i + 1]] *= 1 - alpha
+    return w
+
+def legacy_hrp(corr, cov):
+    link = HierarchicalClustering.get_linkage(corr.values)
+    sort_ix = corr.index[_legacy_quasi_diag(link)].tolist()
+    weights = _legacy_rec_bisection(cov.loc[sort_ix, sort_ix], sort_ix)
+    return weights.loc[corr.index]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 250, 500, 1000])
+    parser.add_argument('--days', type=int, default=504)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'N':>6} {'legacy (s)':>11} {'numpy (s)':>10} {'speedup':>8} {'identical':>9}")
+    for n in args.sizes:
+        returns = factor_returns(n, args.days)
+        corr, cov = returns.corr(), returns.cov()
+        t_old, w_old = timeit(lambda: legacy_hrp(corr, cov), args.repeat)
+        t_new, w_new = timeit(lambda: HRPOptimizer().get_weights(corr=corr, cov=cov), args.repeat)
+        identical = np.array_equal(w_old.values, w_new.values)
+        print(f"{n:>6} {t_old:>11.3f} {t_new:>10.3f} {t_old / t_new:>8.1f} {str(identical):>9}")
+
+if __name__ == '__main__':
+    main()
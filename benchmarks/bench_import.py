@@ -0,0 +1,45 @@
+"""
+啟動時間預算：在新的直譯器中 import 純計算路徑 (src.cli / src.backtest)，
+確認沒有載入 matplotlib / seaborn / sklearn / scipy.optimize，且 import 時間不超過預算。
+用法: python -m benchmarks.bench_import [--budget 1.0] [--repeat 5]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY = ['matplotlib', 'seaborn', 'sklearn', 'scipy.optimize', 'yfinance']
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+def probe(module):
+    code = _PROBE.format(module=module, heavy=HEAVY)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modules', nargs='+', default=['src.backtest', 'src.cli'])
+    parser.add_argument('--budget', type=float, default=1.0, help='import 時間上限 (秒)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<16} {'best (s)':>9} {'budget':>7}  heavy modules loaded")
+    for module in args.modules:
+        runs = [probe(module) for _ in range(args.repeat)]
+        best = min(r['seconds'] for r in runs)
+        loaded = runs[-1]['loaded']
+        ok = best <= args.budget and not loaded
+        failed |= not ok
+        print(f"{module:<16} {best:>9.3f} {args.budget:>7.2f}  {', '.join(loaded) or '-'}{'' if ok else '  FAIL'}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+平行回測的擴展性測試：n_jobs 從 1 到全部核心，並檢查結果與序列執行逐位元相同。
+用法: python -m benchmarks.bench_parallel [--assets 180] [--days 1260] [--freq 5]
+"""
+import argparse
+import os
+from benchmarks.harness import timeit
+from benchmarks.synthetic import factor_returns
+from src.backtest import RollingBacktest, Strategy
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--assets', type=int, default=180)
+    parser.add_argument('--days', type=int, default=1260)
+    parser.add_argument('--freq', type=int, default=5)
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    returns = factor_returns(args.assets, args.days)
+    mv_opt = MeanVarianceOptimizer()
+    strategies = [
+        Strategy('Raw GMVP', mv_opt),
+        Strategy('RMT GMVP', mv_opt, 'RMT'),
+        Strategy('LW GMVP', mv_opt, 'LW'),
+        Strategy('HRP', HRPOptimizer()),
+    ]
+    n_jobs_list = sorted({1, *[2**i for i in range(10) if 2**i <= args.max_jobs], args.max_jobs})
+    baseline = None
+    print(f"N={args.assets}, T={args.days}, rebalance_freq={args.freq}")
+    print(f"{'n_jobs':>6} {'seconds':>9} {'speedup':>8} {'identical':>9}")
+    for n_jobs in n_jobs_list:
+        bt = RollingBacktest(returns, window=252, rebalance_freq=args.freq)
+        elapsed, (results, _) = timeit(lambda: bt.run_strategies(strategies, n_jobs=n_jobs), repeat=1)
+        if baseline is None:
+            baseline = (elapsed, results)
+        identical = results.equals(baseline[1])
+        print(f"{n_jobs:>6} {elapsed:>9.2f} {baseline[0] / elapsed:>8.2f} {str(identical):>9}")
+
+if __name__ == '__main__':
+    main()
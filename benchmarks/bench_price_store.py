@@ -0,0 +1,40 @@
+"""
+價格資料讀取比較：單一 CSV (pd.read_csv) vs 欄式記憶體映射 PriceStore。
+用法: python -m benchmarks.bench_price_store [--assets 3000] [--days 2520]
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks.harness import timeit
+from benchmarks.synthetic import factor_returns
+from src.price_store import PriceStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--assets', type=int, default=3000)
+    parser.add_argument('--days', type=int, default=2520)
+    parser.add_argument('--subset', type=int, default=180)
+    args = parser.parse_args()
+
+    prices = 100 * (1 + factor_returns(args.assets, args.days)).cumprod()
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'stock_prices.csv')
+        prices.to_csv(csv_path)
+        PriceStore(os.path.join(root, 'prices')).write(prices)
+
+        t_csv, from_csv = timeit(lambda: pd.read_csv(csv_path, index_col=0, parse_dates=True))
+        t_all, from_store = timeit(lambda: PriceStore(os.path.join(root, 'prices')).load())
+        tickers = list(prices.columns[:: max(1, args.assets // args.subset)][: args.subset])
+        start, end = prices.index[len(prices) // 2], prices.index[-1]
+        t_sub, _ = timeit(lambda: PriceStore(os.path.join(root, 'prices')).load(tickers, start, end))
+
+    assert np.allclose(from_csv.values, from_store.values)
+    print(f"{args.days} days x {args.assets} tickers")
+    print(f"  read_csv (all)               : {t_csv:8.3f} s")
+    print(f"  PriceStore.load (all)        : {t_all:8.3f} s  ({t_csv / t_all:.0f}x)")
+    print(f"  PriceStore.load ({len(tickers)} tickers, half range): {t_sub:8.3f} s")
+
+if __name__ == '__main__':
+    main()
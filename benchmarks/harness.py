@@ -0,0 +1,91 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+def timeit(fn, repeat=3, warmup=1):
+    """
+    先不計時執行 warmup 次 (延遲載入的 sklearn / scipy 模組、第一次配置記憶體不計入)，
+    再執行 repeat 次取最短時間，回傳 (秒數, 最後一次的輸出)
+    """
+    for _ in range(warmup):
+        fn()
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+def peak_memory(fn):
+    """以 tracemalloc 量測單次執行的峰值記憶體 (MB，NumPy 的配置也會被追蹤)"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+def measure(fn, repeat=3, memory=True, warmup=1):
+    """
+    量測一個階段：計時與峰值記憶體分開執行 (tracemalloc 會拖慢計時)
+    回傳 ({'seconds': ..., 'peak_mb': ...}, 輸出)
+    """
+    seconds, out = timeit(fn, repeat, warmup)
+    result = {'seconds': seconds}
+    if memory:
+        result['peak_mb'] = peak_memory(fn)
+    return result, out
+
+def environment():
+    """記錄執行環境 (比較不同機器的結果時參考)"""
+    import scipy
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def save(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(report, baseline, time_threshold=1.25, memory_threshold=1.25, min_seconds=1e-3):
+    """
+    與基準結果比較，回傳每個 (案例, 階段) 一列的比較結果列表。
+    時間或峰值記憶體超過基準的 threshold 倍即視為退化 (regression)；
+    基準時間短於 min_seconds 的階段雜訊太大，只比較記憶體。
+    """
+    base_cases = {case['name']: case for case in baseline['cases']}
+    rows = []
+    for case in report['cases']:
+        base = base_cases.get(case['name'])
+        if base is None:
+            continue
+        for stage, result in case['stages'].items():
+            ref = base['stages'].get(stage)
+            if ref is None:
+                continue
+            time_ratio = result['seconds'] / ref['seconds'] if ref['seconds'] > 0 else np.nan
+            mem_ratio = (result['peak_mb'] / ref['peak_mb']
+                         if 'peak_mb' in result and ref.get('peak_mb') else np.nan)
+            regression = ((ref['seconds'] >= min_seconds and time_ratio > time_threshold)
+                          or mem_ratio > memory_threshold)
+            rows.append({'case': case['name'], 'stage': stage,
+                         'seconds': result['seconds'], 'time_ratio': time_ratio,
+                         'peak_mb': result.get('peak_mb', np.nan), 'memory_ratio': mem_ratio,
+                         'regression': bool(regression)})
+    return rows
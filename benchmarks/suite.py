@@ -0,0 +1,145 @@
+"""
+各階段的效能基準測試 (合成因子模型數據，不需網路)：
+RMT fit/transform、Ledoit-Wolf、視窗張量批次 LW / RMT、每日調倉的 RMT (完整 eigh vs 子空間追蹤)、GMVP、HRP 分群 (linkage / quasi-diag / bisection) 與完整滾動回測，
+每個階段先執行一次不計時的暖身，記錄最短執行時間與峰值記憶體，輸出 JSON 並與儲存的基準比較 (超過門檻即回傳非零結束碼)。
+用法:
+  python -m benchmarks.suite [--assets 180 500] [--days 756] [--factors 5] [--output bench.json]
+                             [--baseline benchmarks/baseline.json] [--save-baseline]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import numpy as np
+from benchmarks import harness
+from benchmarks.synthetic import factor_returns
+from src.backtest import RollingBacktest, Strategy
+from src.batch_estimation import window_view, batch_cov, batch_corr, ledoit_wolf_batch, rmt_clean_batch
+from src.clustering import HierarchicalClustering
+from src.denoise import RMTDenoising, LedoitWolfDenoising
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+
+def run_case(n_assets, n_days, n_factors=5, repeat=3, memory=True, window=252, rebalance_freq=21):
+    """執行單一 (N, T) 案例的所有階段"""
+    returns = factor_returns(n_assets, n_days, n_factors)
+    X = returns.values
+    stages = {}
+
+    def stage(name, fn, repeat=repeat):
+        stages[name], out = harness.measure(fn, repeat, memory)
+        return out
+
+    # 1. 去噪
+    rmt = stage('rmt_fit', lambda: RMTDenoising().fit(X))
+    corr_clean = stage('rmt_transform', rmt.transform)
+    detected = int(np.sum(rmt.eigenvalues_ > rmt.lambda_max))
+    rmt_lr = stage('rmt_randomized_fit', lambda: RMTDenoising(method='randomized').fit(X))
+    stage('rmt_randomized_transform', rmt_lr.transform)
+    stage('lw_fit', lambda: LedoitWolfDenoising().fit(X))
+    if n_days > window:
+        # 視窗張量批次估計：每個調倉點一個訓練視窗
+        Xw = window_view(X, window, np.arange(window, n_days, rebalance_freq))
+        stage('lw_batch', lambda: ledoit_wolf_batch(Xw))
+        corrs = batch_corr(batch_cov(Xw))
+        stage('rmt_batch', lambda: rmt_clean_batch(corrs, window))
+        # 每日調倉：連續 rebalance_freq 個逐日滑動的視窗，完整 eigh vs 子空間追蹤 (第一個視窗做完整 eigh)
+        daily = batch_corr(batch_cov(window_view(X, window, np.arange(window, min(n_days, window + rebalance_freq)))))
+        def rmt_daily(method):
+            rmt = RMTDenoising(method=method)
+            return [rmt.fit_corr(c, window).transform() for c in daily]
+        stage('rmt_daily_full', lambda: rmt_daily('full'))
+        stage('rmt_daily_tracking', lambda: rmt_daily('tracking'))
+    # 2. GMVP (原始協方差與 RMT 去噪後的協方差)
+    cov = np.cov(X, rowvar=False)
+    std = np.sqrt(np.diag(cov))
+    cov_clean = np.outer(std, std) * corr_clean
+    mv_opt = MeanVarianceOptimizer()
+    stage('gmvp', lambda: mv_opt.get_gmvp_weights(cov_clean))
+    stage('gmvp_factor', lambda: mv_opt.get_gmvp_weights(rmt_lr.transform().to_covariance(std)))
+    # 3. HRP 分群的三個步驟
+    corr = returns.corr().values # 對稱且對角為 1 (squareform 會檢查)
+    hc = HierarchicalClustering
+    link = stage('hrp_linkage', lambda: hc.get_linkage(corr))
+    sort_ix = stage('hrp_quasi_diag', lambda: np.asarray(hc.get_quasi_diag(link)))
+    stage('hrp_bisection', lambda: hc.get_rec_bisection_array(cov[np.ix_(sort_ix, sort_ix)]))
+    # 4. 完整滾動回測 (四個策略)
+    if n_days > window:
+        strategies = [
+            Strategy('Raw GMVP', mv_opt),
+            Strategy('RMT GMVP', mv_opt, 'RMT'),
+            Strategy('LW GMVP', mv_opt, 'LW'),
+            Strategy('HRP', HRPOptimizer()),
+        ]
+        def backtest():
+            with contextlib.redirect_stdout(io.StringIO()):
+                # 不計算條件數 (與基準值相同，只量測估計與求解)
+                return RollingBacktest(returns, window, rebalance_freq, diagnostics=False).run_strategies(strategies)
+        stage('backtest', backtest, repeat=1)
+    return {
+        'name': f'N{n_assets}_T{n_days}_K{n_factors}',
+        'n_assets': n_assets,
+        'n_days': n_days,
+        'n_factors': n_factors,
+        'detected_factors': detected,
+        'stages': stages,
+    }
+
+def run(sizes, days, factors=5, repeat=3, memory=True):
+    cases = []
+    for n_days in days:
+        for n_assets in sizes:
+            print(f"Running N={n_assets}, T={n_days}, K={factors}...")
+            cases.append(run_case(n_assets, n_days, factors, repeat, memory))
+    return {'environment': harness.environment(), 'cases': cases}
+
+def print_report(report):
+    for case in report['cases']:
+        print(f"\n{case['name']} (RMT detected {case['detected_factors']} / {case['n_factors']} factors)")
+        print(f"  {'stage':<26} {'seconds':>10} {'peak MB':>9}")
+        for stage, r in case['stages'].items():
+            print(f"  {stage:<26} {r['seconds']:>10.4f} {r.get('peak_mb', np.nan):>9.1f}")
+
+def print_comparison(rows):
+    print(f"\n  {'case':<18} {'stage':<26} {'time x':>7} {'mem x':>7}")
+    for r in rows:
+        flag = '  REGRESSION' if r['regression'] else ''
+        print(f"  {r['case']:<18} {r['stage']:<26} {r['time_ratio']:>7.2f} {r['memory_ratio']:>7.2f}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assets', type=int, nargs='+', default=[180, 500], help='N (100 ~ 5000)')
+    parser.add_argument('--days', type=int, nargs='+', default=[756], help='T (252 ~ 2520)')
+    parser.add_argument('--factors', type=int, default=5, help='真實因子個數')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='不量測峰值記憶體')
+    parser.add_argument('--output', default=None, help='輸出 JSON 路徑')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='以這次的結果覆寫基準')
+    parser.add_argument('--time-threshold', type=float, default=1.25)
+    parser.add_argument('--memory-threshold', type=float, default=1.25)
+    args = parser.parse_args()
+
+    report = run(args.assets, args.days, args.factors, args.repeat, not args.no_memory)
+    print_report(report)
+    if args.output:
+        harness.save(report, args.output)
+        print(f"\n[Saved] {args.output}")
+    if args.save_baseline:
+        harness.save(report, args.baseline)
+        print(f"[Saved] baseline {args.baseline}")
+        return 0
+    try:
+        baseline = harness.load(args.baseline)
+    except FileNotFoundError:
+        print(f"\nNo baseline at {args.baseline} (run with --save-baseline to create one)")
+        return 0
+    rows = harness.compare(report, baseline, args.time_threshold, args.memory_threshold)
+    print_comparison(rows)
+    n_bad = sum(r['regression'] for r in rows)
+    print(f"\n{n_bad} regression(s) vs {args.baseline}")
+    return 1 if n_bad else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# pytest 的 rootdir conftest：讓 tests/ 可以直接 import src、benchmarks 與 tests.helpers
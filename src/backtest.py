@@ -1,70 +1,589 @@
+from collections import namedtuple
 import numpy as np
 import pandas as pd
-from src.denoise import RMTDenoising, LedoitWolfDenoising
+from src.batch_estimation import window_view, chunk_size, is_batchable, denoise_batch
+from src.cache import hash_array, fingerprint
+from src.denoise import RMTDenoising, LedoitWolfDenoising, FactorCovariance
+from src.moments import rolling_moments
+from src.clustering import HierarchicalClustering
+from src.optimization import HRPOptimizer
+from src.parallel import n_workers, map_shared, attach_shared
+from src.tracing import Tracer, NULL_TRACER
+
+# 策略設定：名稱、優化器、去噪方法
+# denoise_method: None / 'RMT' / 'LW'，或設定好參數的 RMTDenoising / LedoitWolfDenoising 物件
+Strategy = namedtuple('Strategy', ['name', 'optimizer', 'denoise_method'], defaults=[None])
+
+class WindowEstimates:
+    """
+    單一訓練視窗的共用統計量
+    cov / corr / std / 特徵值分解 / 去噪後的協方差皆為 lazy，
+    第一次被取用時才計算，之後所有策略共用同一份結果。
+    cache: src.cache.DiskCache，特徵值分解、連結矩陣與去噪後的協方差另存到磁碟，
+           以訓練數據的雜湊 (data_key) 與去噪參數為鍵，下次執行時直接讀取
+    """
+    def __init__(self, moments, train_values, assets, tracer=NULL_TRACER, cache=None):
+        self.moments = moments
+        self.train_values = train_values
+        self.assets = assets
+        self.tracer = tracer
+        self.cache = cache
+        self.T = train_values.shape[0]
+        self._cache = {}
+        self._data_key = None
+
+    @property
+    def data_key(self):
+        """訓練數據切片的雜湊"""
+        if self._data_key is None:
+            self._data_key = hash_array(self.train_values)
+        return self._data_key
+
+    def _get(self, key, fn, persist=None):
+        """persist: 磁碟快取的鍵 (None 代表只在記憶體中共用)"""
+        if key not in self._cache:
+            if persist is None or self.cache is None:
+                self._cache[key] = fn()
+            else:
+                disk_key = self.cache.key(self.data_key, *persist)
+                entry = self.cache.get(disk_key)
+                if entry is None:
+                    value = fn()
+                    self.cache.put(disk_key, **self._encode(value))
+                else:
+                    value = self._decode(entry)
+                self._cache[key] = value
+        return self._cache[key]
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, pd.DataFrame):
+            return {'frame': value.values}
+        if isinstance(value, FactorCovariance):
+            return {'loadings': value.loadings, 'factor_variances': value.factor_variances,
+                    'diagonal': value.diagonal}
+        if isinstance(value, tuple):
+            return {f'item{i}': v for i, v in enumerate(value)}
+        return {'array': np.asarray(value)}
+
+    def _decode(self, entry):
+        if 'frame' in entry:
+            return self._frame(entry['frame'])
+        if 'loadings' in entry:
+            return FactorCovariance(entry['loadings'], entry['factor_variances'], entry['diagonal'],
+                                    index=self.assets)
+        if 'item0' in entry:
+            return tuple(entry[f'item{i}'] for i in range(len(entry)))
+        return entry['array']
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=self.assets, columns=self.assets)
+
+    @property
+    def cov(self):
+        return self._get('cov', lambda: self._frame(self.moments.cov()))
+
+    @property
+    def corr(self):
+        return self._get('corr', lambda: self._frame(self.moments.corr()))
+
+    @property
+    def std(self):
+        return self._get('std', lambda: np.sqrt(np.diag(self.cov.values)))
+
+    @property
+    def eigh(self):
+        """相關係數矩陣的特徵值分解 (eigenvalues, eigenvectors)"""
+        return self._get('eigh', lambda: np.linalg.eigh(self.corr.values), persist=('eigh',))
+
+    @property
+    def linkage(self):
+        """corr 的階層分群連結矩陣 (HRP 共用)"""
+        return self._get('linkage', lambda: HierarchicalClustering.get_linkage(self.corr.values),
+                         persist=('linkage',))
+
+    def _rmt_cov(self, rmt):
+        if rmt.method == 'tracking':
+            # 子空間追蹤：從上一個視窗的訊號子空間暖啟動，不需要 (也不使用) 完整的特徵值分解
+            rmt.fit_corr(self.corr.values, self.T, X=self.train_values)
+            self.tracer.sample('rmt_signals', rmt.eigenvectors_.shape[1])
+            self.tracer.sample('rmt_iterations', rmt.iterations_)
+            return self._frame(np.outer(self.std, self.std) * rmt.transform())
+        if rmt.method != 'full':
+            # 低秩模式：直接由訓練數據取得訊號因子，回傳 FactorCovariance (不建立 N x N 矩陣)
+            rmt.fit(self.train_values, T=self.T)
+            self.tracer.sample('rmt_signals', rmt.eigenvectors_.shape[1])
+            return rmt.transform().to_covariance(self.std, index=self.assets)
+        rmt.fit_corr(self.corr.values, self.T, eig=self.eigh, X=self.train_values)
+        self.tracer.sample('rmt_signals', np.sum(rmt.eigenvalues_ > rmt.lambda_max))
+        corr_clean = rmt.transform()
+        # 將去噪後的 Corr 轉回 Cov: Cov = D * Corr * D
+        return self._frame(np.outer(self.std, self.std) * corr_clean)
+
+    def _lw_cov(self, lw):
+        lw.fit(self.train_values)
+        return self._frame(lw.lw.covariance_.astype(self.train_values.dtype, copy=False))
+
+    @staticmethod
+    def _cov_key(denoise_method):
+        if isinstance(denoise_method, str):
+            return denoise_method.lower() + '_cov'
+        return ('rmt_cov' if isinstance(denoise_method, RMTDenoising) else 'lw_cov', id(denoise_method))
+
+    def covariance(self, denoise_method=None):
+        """依去噪方法取得協方差矩陣 (DataFrame 或 FactorCovariance)"""
+        persist = ('cov', fingerprint(denoise_method))
+        if getattr(denoise_method, 'path_dependent', False):
+            # 追蹤模式的結果依賴先前的視窗，不存進磁碟快取
+            persist = None
+        if denoise_method == 'RMT':
+            return self._get('rmt_cov', lambda: self._rmt_cov(RMTDenoising()), persist)
+        elif denoise_method == 'LW':
+            return self._get('lw_cov', lambda: self._lw_cov(LedoitWolfDenoising()), persist)
+        elif isinstance(denoise_method, RMTDenoising):
+            return self._get(self._cov_key(denoise_method), lambda: self._rmt_cov(denoise_method), persist)
+        elif isinstance(denoise_method, LedoitWolfDenoising):
+            return self._get(self._cov_key(denoise_method), lambda: self._lw_cov(denoise_method), persist)
+        return self.cov
+
+    def has_covariance(self, denoise_method):
+        """去噪協方差是否已算好 (磁碟快取命中時順便讀入)"""
+        key = self._cov_key(denoise_method)
+        if key not in self._cache and self.cache is not None:
+            entry = self.cache.get(self.cache.key(self.data_key, 'cov', fingerprint(denoise_method)))
+            if entry is not None:
+                self._cache[key] = self._decode(entry)
+        return key in self._cache
+
+    def has_eigh(self):
+        """特徵值分解是否已算好 (磁碟快取命中時順便讀入)"""
+        if 'eigh' not in self._cache and self.cache is not None:
+            entry = self.cache.get(self.cache.key(self.data_key, 'eigh'))
+            if entry is not None:
+                self._cache['eigh'] = self._decode(entry)
+        return 'eigh' in self._cache
+
+    def set_eigh(self, evals, evecs):
+        """放入批次算好的特徵值分解 (之後所有 RMT 設定共用)"""
+        self._cache['eigh'] = (evals, evecs)
+        if self.cache is not None:
+            self.cache.put(self.cache.key(self.data_key, 'eigh'), **self._encode((evals, evecs)))
+
+    def set_covariance(self, denoise_method, cov):
+        """放入批次估計好的去噪協方差 (N x N 陣列)"""
+        key = self._cov_key(denoise_method)
+        self._cache[key] = self._frame(cov)
+        if self.cache is not None:
+            self.cache.put(self.cache.key(self.data_key, 'cov', fingerprint(denoise_method)), frame=cov)
+
+class WeightsHistory:
+    """
+    單一策略的權重歷史，以 (調倉日 x 資產) 的 2-D ndarray 儲存，需要時才建立標籤：
+    h[k] / h[-1] -> pd.Series (name 為調倉日)，h[a:b]、h[布林遮罩]、h[整數陣列] -> WeightsHistory，
+    np.asarray(h) -> (K, N) 陣列，h.to_frame() -> DataFrame
+    只支援位置索引；以日期標籤選取請用 h.to_frame().loc
+    """
+    def __init__(self, values, dates, assets):
+        self.values = values
+        self.dates = pd.Index(dates)
+        self.assets = pd.Index(assets)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, k):
+        if isinstance(k, (int, np.integer)):
+            return pd.Series(self.values[k], index=self.assets, name=self.dates[k])
+        if isinstance(k, slice):
+            return WeightsHistory(self.values[k], self.dates[k], self.assets)
+        key = np.asarray(k)
+        if key.size == 0:
+            key = key.astype(np.intp)
+        if key.ndim == 1 and (key.dtype == bool or np.issubdtype(key.dtype, np.integer)):
+            return WeightsHistory(self.values[key], self.dates[key], self.assets)
+        raise TypeError(f"WeightsHistory indices must be integers, slices, boolean masks or integer arrays, "
+                        f"not {type(k).__name__} (use to_frame().loc for date labels)")
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
+
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=self.dates, columns=self.assets)
 
 class RollingBacktest:
     """
     滾動視窗回測引擎
+    tracer: src.tracing.Tracer，記錄每個視窗各階段 (slice / estimate / denoise / optimize / evaluate)
+            的耗時與 fallback、奇異矩陣、RMT 訊號個數、條件數等計數 (None 代表停用)
+    dtype: 'float32' 時報酬、動差、去噪與 GMVP 求解都以 float32 進行 (記憶體減半，速度不一定較快)；
+           樣本外報酬仍以 float64 儲存。誤差依數據而定，應以 benchmarks/bench_float32.py 在自己的數據上確認：
+           合成數據 N=180、T=1008 時 RMT / LW GMVP 權重誤差約 1e-6；
+           HRP 的分群在相關係數接近時可能改變順序 (例如 N=120、T=600 時權重誤差 4e-4)；
+           N >= window 時原始協方差為奇異矩陣，Raw GMVP 在 float32 下的結果會完全不同，應搭配去噪使用
+    batched: LW / RMT 去噪每 batch_size 個視窗以視窗張量批次估計 (False 則逐一視窗以 sklearn / eigh 計算)
+    cache: src.cache.DiskCache，每個視窗的估計與權重存到磁碟，重跑或只改一個策略時其餘結果直接讀取
+    diagnostics: 記錄 GMVP 每個調倉日的條件數 (self.diagnostics 的 cond 欄)；需要額外的批次 eigvalsh
+                 (O(K N^3)，約與求解本身一樣久)，False 時 cond 為 NaN
     """
-    def __init__(self, returns, window=252, rebalance_freq=21):
+    def __init__(self, returns, window=252, rebalance_freq=21, refresh_every=None, batch_size=32,
+                 tracer=None, dtype='float64', batched=True, cache=None, diagnostics=True):
         self.returns = returns # 這裡必須是 Raw Returns (pct_change)
         self.window = window
         self.rebalance_freq = rebalance_freq
+        # 增量動差每隔幾次調倉從頭重建 (預設約每滾過一個完整視窗重建一次)
+        if refresh_every is None:
+            refresh_every = max(1, window // rebalance_freq)
+        self.refresh_every = refresh_every
+        # GMVP 每累積 batch_size 個視窗的協方差就批次求解一次 (限制記憶體用量)
+        self.batch_size = batch_size
+        self.tracer = NULL_TRACER if tracer is None else tracer
+        self.dtype = np.dtype(dtype)
+        self.batched = batched
+        self.cache = cache
+        self.compute_cond = diagnostics
         self.weights_history = {}
-        
+        self.diagnostics = {}
+
     def run_strategy(self, name, optimizer, denoise_method=None):
         """
         執行單一策略的回測
         """
+        results, _ = self.run_strategies([Strategy(name, optimizer, denoise_method)])
+        return results[name]
+
+    def run_strategies(self, strategies, n_jobs=1):
+        """
+        一次走訪所有視窗，同時回測多個策略。
+        strategies: Strategy 或 (name, optimizer, denoise_method) 的列表
+        每個視窗的 cov / corr / 特徵值分解只算一次並由所有策略共用。
+        n_jobs: 平行處理的行程數 (-1 代表使用全部核心)，結果與序列執行逐位元相同
+                (有換手率限制、沿用樹狀圖的 HRP 或 RMT 子空間追蹤的策略依賴前一次調倉的結果，仍在主行程依序計算)
+        回傳 (對齊的樣本外報酬 DataFrame, {策略名稱: WeightsHistory})
+        """
+        strategies = [Strategy(*s) for s in strategies]
+        # 同一個策略物件重複回測時，結果不依賴先前的執行
+        _reset_state(strategies)
         T = len(self.returns)
-        portfolio_returns = []
-        dates = []
-        print(f"Backtesting strategy: {name}...")
-        # 滾動迴圈
-        for t in range(self.window, T, self.rebalance_freq):
-            # 1. 取得訓練窗口 (Train Window)
-            train_data = self.returns.iloc[t-self.window : t]
-            # 2. 取得測試窗口 (Test Window) - 未來的一個月
-            test_data = self.returns.iloc[t : min(t+self.rebalance_freq, T)]
-            if test_data.empty: break
-            # 3. 計算協方差矩陣 (Covariance Matrix)
-            if denoise_method == 'RMT':
-                # RMT 需要標準化數據來算 Correlation
-                # train_std = (train_data - train_data.mean()) / train_data.std() # RMT 類別內會處理 corr
-                rmt = RMTDenoising().fit(train_data) # fit 裡面會算 corr
-                corr_clean = rmt.transform()
-                # 將去噪後的 Corr 轉回 Cov: Cov = D * Corr * D
-                stds = train_data.std().values
-                cov_estim = np.outer(stds, stds) * corr_clean
-                # 轉為 DataFrame 以便 optimizer 使用 index
-                cov_estim = pd.DataFrame(cov_estim, index=train_data.columns, columns=train_data.columns) 
-            elif denoise_method == 'LW':
-                lw = LedoitWolfDenoising().fit(train_data)
-                # LW 的 transform 我們之前寫的是回傳 corr，這裡我們直接拿 cov
-                cov_estim = lw.lw.covariance_
-                cov_estim = pd.DataFrame(cov_estim, index=train_data.columns, columns=train_data.columns)
+        # 序列與平行路徑使用相同記憶體佈局的陣列，確保浮點運算順序一致
+        values = np.ascontiguousarray(self.returns.values, dtype=self.dtype)
+        assets = self.returns.columns
+        print(f"Backtesting strategies: {', '.join(s.name for s in strategies)}...")
+        # 每個調倉點 t 使用 [t-window, t) 訓練、[t, t+rebalance_freq) 測試
+        points = list(range(self.window, T, self.rebalance_freq))
+        n_jobs = n_workers(n_jobs)
+        if n_jobs > 1 and len(points) > 1:
+            # 權重依賴前一次結果的策略 (換手率限制、沿用樹狀圖、子空間追蹤) 不能切段平行，另外依序計算
+            independent = [s for s in strategies if not _is_path_dependent(s)]
+            dependent = [s for s in strategies if _is_path_dependent(s)]
+            W, diagnostics = {}, {}
+            if independent:
+                W, diagnostics = self._compute_weights_parallel(values, points, independent, n_jobs)
+            if dependent:
+                W_dep, diag_dep = compute_weights(values, assets, self.window, points, dependent,
+                                                  self.refresh_every, self.batch_size, self.tracer,
+                                                  self.batched, self.cache, self.compute_cond)
+                W.update(W_dep)
+                diagnostics.update(diag_dep)
+        else:
+            W, diagnostics = compute_weights(values, assets, self.window, points, strategies,
+                                             self.refresh_every, self.batch_size, self.tracer,
+                                             self.batched, self.cache, self.compute_cond)
+        # 計算樣本外績效 (Out-of-Sample Return)
+        # 假設這一個月內權重不變 (Buy and Hold): Daily Portfolio Return = w * r
+        # 報酬直接寫入預先配置的 (日期 x 策略) 陣列
+        # 數據不足一個視窗 (沒有調倉點) 時回傳空的結果
+        portfolio_returns = np.empty((max(T - self.window, 0), len(strategies)))
+        for k, t in enumerate(points):
+            with self.tracer.span('evaluate', t=t):
+                test_values = values[t : t+self.rebalance_freq]
+                rows = slice(t - self.window, t - self.window + len(test_values))
+                for j, s in enumerate(strategies):
+                    portfolio_returns[rows, j] = test_values @ W[s.name][k]
+        dates = self.returns.index[self.window : ]
+        # 記錄權重 (方便之後畫圖分析)，Series / DataFrame 只在取用時才建立
+        rebalance_dates = self.returns.index[points]
+        weights = {s.name: WeightsHistory(W[s.name], rebalance_dates, assets) for s in strategies}
+        self.weights_history.update(weights)
+        # GMVP 每個調倉日的求解方法與條件數
+        for name, info in diagnostics.items():
+            self.diagnostics[name] = info.set_index(rebalance_dates)
+        results = pd.DataFrame(portfolio_returns, index=dates, columns=[s.name for s in strategies])
+        return results, weights
+
+    def _compute_weights_parallel(self, values, points, strategies, n_jobs):
+        """
+        將調倉點切成數段交給行程池計算。
+        報酬矩陣只放進共享記憶體一次，每個任務只傳遞調倉點列表；
+        分段長度取 refresh_every 的倍數，使每段的動差重建點與序列執行一致。
+        """
+        n_chunks = min(len(points), 4 * n_jobs)
+        chunk = -(-len(points) // n_chunks)
+        chunk = -(-chunk // self.refresh_every) * self.refresh_every
+        chunks = [points[i : i+chunk] for i in range(0, len(points), chunk)]
+        initargs = (self.returns.columns, self.window, strategies, self.refresh_every, self.batch_size,
+                    self.tracer.enabled, self.tracer.memory, self.batched, self.cache, self.compute_cond)
+        parts = map_shared(_run_chunk, chunks, values, n_jobs, _init_worker, initargs)
+        # 各 worker 的量測結果併入主 Tracer
+        for p in parts:
+            self.tracer.merge(p[2])
+            if self.cache is not None:
+                self.cache.hits += p[3][0]
+                self.cache.misses += p[3][1]
+        W = {s.name: np.concatenate([p[0][s.name] for p in parts]) for s in strategies}
+        diagnostics = {name: pd.concat([p[1][name] for p in parts], ignore_index=True)
+                       for name in parts[0][1]}
+        return W, diagnostics
+
+def _is_gmvp(strategy):
+    return not isinstance(strategy.optimizer, HRPOptimizer)
+
+def _get_weights(strategy, estimates, t, tracer=NULL_TRACER):
+    """以共用統計量計算 HRP 在視窗 t 的權重"""
+    try:
+        # HRP 以原始 corr 分群；群組變異數使用 (可選擇去噪的) 協方差
+        with tracer.span('denoise', t=t, strategy=strategy.name):
+            cov = estimates.covariance(strategy.denoise_method)
+        with tracer.span('optimize', t=t, strategy=strategy.name):
+            # 不沿用舊樹狀圖時，連結矩陣由同一視窗的所有 HRP 策略共用 (並可存進磁碟快取)
+            link = estimates.linkage if getattr(strategy.optimizer, 'drift_threshold', None) is None else None
+            return strategy.optimizer.get_weights(corr=estimates.corr, cov=cov, link=link).values
+    except Exception as e:
+        tracer.count('fallback')
+        tracer.count(f'fallback.{type(e).__name__}')
+        print(f"Optimization failed at {t}: {e}")
+        return np.full(len(estimates.assets), 1.0/len(estimates.assets))
+
+def _is_path_dependent(strategy):
+    """權重依賴上一次調倉結果的策略 (例如有換手率限制、RMT 子空間追蹤)，只能依序計算"""
+    return (getattr(strategy.optimizer, 'path_dependent', False)
+            or getattr(strategy.denoise_method, 'path_dependent', False))
+
+def _reset_state(strategies):
+    """清除跨回測保留的狀態 (HRP 沿用的樹狀圖與參考距離矩陣、RMT 追蹤的子空間)"""
+    for s in strategies:
+        if isinstance(s.optimizer, HRPOptimizer):
+            s.optimizer.reset_cache()
+        if isinstance(s.denoise_method, RMTDenoising):
+            s.denoise_method.reset_subspace()
+
+def _solve_gmvp(strategy, covs, ts, tracer=NULL_TRACER, w_prev=None, diagnostics=False):
+    """
+    批次求解一段視窗的 GMVP 權重 (w_prev: 上一個調倉點的權重，供有限制條件時暖啟動)
+    diagnostics: 是否計算條件數 (額外的批次 eigvalsh)
+    """
+    try:
+        with tracer.span('optimize', strategy=strategy.name, t_start=ts[0], t_stop=ts[-1], n_windows=len(ts),
+                         ts=[int(t) for t in ts]):
+            weights, info = strategy.optimizer.get_gmvp_weights_batch(covs, diagnostics=diagnostics,
+                                                                      w_prev=w_prev)
+    except Exception as e:
+        tracer.count(f'fallback.{type(e).__name__}', len(ts))
+        print(f"Optimization failed at {ts[0]}-{ts[-1]}: {e}")
+        K, N = len(covs), covs[0].shape[0]
+        weights, info = np.full((K, N), 1.0/N), pd.DataFrame({'method': ['equal'] * K, 'cond': np.nan})
+    if tracer.enabled:
+        # Cholesky 失敗 (非正定) 的切片改以 LU / 最小平方求解；解不出來的退回等權重
+        method = info['method'].str.split('+').str[0]
+        tracer.count('singular', int(method.isin(['lu', 'lstsq']).sum()))
+        tracer.count('fallback', int((method == 'equal').sum()))
+        tracer.sample('cond', info['cond'].dropna().values)
+        if 'iterations' in info:
+            tracer.sample('iterations', info['iterations'].values[info['iterations'].values > 0])
+    return weights, info
+
+def _denoise_batch(batch, methods, values, window, ts, tracer=NULL_TRACER):
+    """
+    以視窗張量批次估計一段視窗的去噪協方差，放進各視窗的 WindowEstimates
+    張量依記憶體預算再分塊 (見 src.batch_estimation.chunk_size)；
+    RMT 的特徵值分解存回各視窗的 WindowEstimates，多個 RMT 設定 (例如不同 edge) 每個視窗只分解一次
+    """
+    n = chunk_size(window, values.shape[1], budget=2**26, itemsize=values.itemsize)
+    for method in methods:
+        # 已在快取中的視窗不再估計
+        todo = [j for j, e in enumerate(batch) if not e.has_covariance(method)]
+        label = method if isinstance(method, str) else type(method).__name__
+        is_lw = label in ('LW', 'LedoitWolfDenoising')
+        for lo in range(0, len(todo), n):
+            part = [batch[j] for j in todo[lo : lo+n]]
+            pts = [ts[j] for j in todo[lo : lo+n]]
+            X = window_view(values, window, pts)
+            covs = np.stack([e.cov.values for e in part])
+            corrs = np.stack([e.corr.values for e in part])
+            with tracer.span('denoise', method=label, t_start=pts[0], t_stop=pts[-1], n_windows=len(pts),
+                             ts=[int(t) for t in pts]):
+                eig = None if is_lw else _batch_eigh(part, corrs)
+                clean, stats = denoise_batch(X, method, covs, corrs, eig)
+            tracer.sample('lw_shrinkage' if is_lw else 'rmt_signals', stats)
+            for e, cov in zip(part, clean):
+                e.set_covariance(method, cov)
+
+def _batch_eigh(part, corrs):
+    """一段視窗的特徵值分解：已算好 (或在磁碟快取中) 的直接取用，其餘以一次批次 eigh 計算後存回"""
+    todo = [j for j, e in enumerate(part) if not e.has_eigh()]
+    if todo:
+        evals, evecs = np.linalg.eigh(corrs[todo])
+        for j, val, vec in zip(todo, evals, evecs):
+            part[j].set_eigh(val, vec)
+    return np.stack([e.eigh[0] for e in part]), np.stack([e.eigh[1] for e in part])
+
+def _is_cacheable(strategy):
+    """
+    權重只由視窗數據 (與上一期權重) 決定的策略；
+    沿用舊樹狀圖的 HRP 與 RMT 子空間追蹤依賴整段歷史，不快取
+    """
+    return (getattr(strategy.optimizer, 'drift_threshold', None) is None
+            and not getattr(strategy.denoise_method, 'path_dependent', False))
+
+def _weights_key(cache, strategy, estimates, w_prev=None, diagnostics=False):
+    """
+    權重的快取鍵：訓練數據雜湊 + 去噪方法與優化器參數 (+ 上一期權重，限有路徑依賴的策略)
+    diagnostics: GMVP 的診斷資訊是否含條件數
+    """
+    prev = hash_array(w_prev) if w_prev is not None and _is_path_dependent(strategy) else None
+    parts = ('weights', estimates.data_key, fingerprint(strategy.denoise_method),
+             fingerprint(strategy.optimizer), prev)
+    return cache.key(*parts, 'cond') if diagnostics and _is_gmvp(strategy) else cache.key(*parts)
+
+def compute_weights(values, assets, window, points, strategies, refresh_every=None, batch_size=32,
+                    tracer=NULL_TRACER, batched=True, cache=None, compute_cond=False):
+    """
+    依序走訪調倉點 points，計算每個策略的權重。
+    values: T x N 報酬陣列
+    GMVP 策略的協方差先暫存，每 batch_size 個視窗以 (K, N, N) 張量批次求解；
+    有限制條件的 GMVP 以上一個調倉點的權重暖啟動。
+    batched: LW 與 RMT (method='full') 的去噪每 batch_size 個視窗以 (K, T, N) 視窗張量批次估計
+             (見 src.batch_estimation)；一段視窗的 cov / corr / 特徵值分解 / 去噪協方差會同時留在記憶體
+    cache: src.cache.DiskCache，每個 (策略, 視窗) 的權重與診斷資訊存到磁碟，命中時跳過估計與求解；
+           沒命中的視窗仍可從快取讀取特徵值分解、連結矩陣與去噪協方差
+    tracer: 記錄每個視窗 slice (動差更新與取訓練窗口) / estimate / denoise / optimize 的耗時
+    compute_cond: GMVP 診斷資訊是否計算條件數 (否則 cond 為 NaN)
+    回傳 ({策略名稱: (len(points), N) 權重陣列}, {GMVP 策略名稱: 診斷資訊 DataFrame})
+    """
+    K = len(points)
+    W = {s.name: np.empty((K, len(assets)), dtype=values.dtype) for s in strategies}
+    gmvp = [s for s in strategies if _is_gmvp(s)]
+    pending = {s.name: [] for s in gmvp}
+    diagnostics = {s.name: [] for s in gmvp}
+    # 可批次估計的去噪方法 (多個策略使用同一個方法時只估計一次)
+    methods = {WindowEstimates._cov_key(s.denoise_method): s.denoise_method
+               for s in strategies if batched and is_batchable(s.denoise_method)}
+    # 批次估計或使用快取時，一段視窗先收集起來再一起處理
+    deferred = bool(methods) or cache is not None
+
+    def lookup(k, estimates, missed, rows):
+        """從快取取出視窗 k 的權重，回傳仍需計算的策略"""
+        todo = []
+        for s in strategies:
+            entry = None
+            if _is_cacheable(s) and s.name not in missed:
+                entry = cache.get(_weights_key(cache, s, estimates, W[s.name][k-1] if k else None, compute_cond))
+            if entry is None:
+                todo.append(s)
+                # 有路徑依賴的策略：上一期要等這段算完才知道，之後的視窗都重新計算
+                if _is_path_dependent(s):
+                    missed.add(s.name)
+                continue
+            tracer.count('cache_hit')
+            W[s.name][k] = entry.pop('weights')
+            if _is_gmvp(s):
+                rows[s.name][k] = {c: v.item() for c, v in entry.items()}
+        return todo
+
+    def store(s, k, estimates, row=None):
+        if cache is not None and _is_cacheable(s):
+            key = _weights_key(cache, s, estimates, W[s.name][k-1] if k else None, compute_cond)
+            cache.put(key, weights=W[s.name][k], **{c: np.asarray(v) for c, v in (row or {}).items()})
+
+    def collect(k, t, estimates, todo):
+        for s in todo:
+            if _is_gmvp(s):
+                # GMVP 吃 Covariance (FactorCovariance 保持結構，不轉成稠密矩陣)
+                with tracer.span('denoise', t=t, strategy=s.name):
+                    cov = estimates.covariance(s.denoise_method)
+                pending[s.name].append((k, cov if isinstance(cov, FactorCovariance) else cov.values))
             else:
-                # 原始 Covariance
-                cov_estim = train_data.cov()
-            # 4. 計算權重
-            try:
-                if name == 'HRP':
-                    # HRP 直接吃原始 returns
-                    w = optimizer.get_weights(train_data)
-                else:
-                    # GMVP 吃 Covariance
-                    w = optimizer.get_gmvp_weights(cov_estim)
-            except Exception as e:
-                print(f"Optimization failed at {t}: {e}")
-                w = pd.Series(1.0/train_data.shape[1], index=train_data.columns)
-            # 記錄權重 (方便之後畫圖分析)
-            if name not in self.weights_history:
-                self.weights_history[name] = []
-            self.weights_history[name].append(w)
-            # 5. 計算樣本外績效 (Out-of-Sample Return)
-            # 假設這一個月內權重不變 (Buy and Hold)
-            # Daily Portfolio Return = w * r
-            p_ret = test_data.dot(w)
-            portfolio_returns.extend(p_ret.values)
-            dates.extend(test_data.index)
-        return pd.Series(portfolio_returns, index=dates, name=name)
\ No newline at end of file
+                W[s.name][k] = _get_weights(s, estimates, t, tracer)
+                store(s, k, estimates)
+
+    # 視窗動差以增量方式更新，不必每次從頭算 cov/corr/std
+    windows = rolling_moments(values, window, points, refresh_every)
+    for start in range(0, K, batch_size):
+        ts = points[start : start+batch_size]
+        batch = []
+        missed, rows = set(), {s.name: {} for s in gmvp}
+        for k, t in enumerate(ts, start):
+            # 取得訓練窗口 (Train Window) 與共用統計量
+            with tracer.span('slice', t=t):
+                _, moments = next(windows)
+                estimates = WindowEstimates(moments, values[t-window : t], assets, tracer, cache)
+            todo = strategies if cache is None else lookup(k, estimates, missed, rows)
+            if todo and (tracer.enabled or deferred):
+                # 先算好共用的 cov / corr：量測時讓 denoise 階段只包含去噪本身；
+                # 延後處理時動差物件會隨下一個視窗更新，必須先取出
+                with tracer.span('estimate', t=t):
+                    estimates.cov, estimates.corr
+            if deferred:
+                batch.append((k, t, estimates, todo))
+            else:
+                collect(k, t, estimates, todo)
+        if deferred:
+            # 只估計仍需計算的視窗與方法
+            for key, method in methods.items():
+                need = [(t, e) for _, t, e, todo in batch
+                        if any(WindowEstimates._cov_key(s.denoise_method) == key for s in todo)]
+                if need:
+                    _denoise_batch([e for _, e in need], [method], values, window, [t for t, _ in need], tracer)
+            for k, t, estimates, todo in batch:
+                collect(k, t, estimates, todo)
+        stop = start + len(ts)
+        for s in gmvp:
+            ks = [k for k, _ in pending[s.name]]
+            if ks:
+                covs = [cov for _, cov in pending[s.name]]
+                if not isinstance(covs[0], FactorCovariance):
+                    covs = np.stack(covs)
+                w_prev = W[s.name][ks[0]-1] if ks[0] else None
+                w, info = _solve_gmvp(s, covs, [points[k] for k in ks], tracer, w_prev, compute_cond)
+                W[s.name][ks] = w
+                pending[s.name] = []
+            if cache is None:
+                diagnostics[s.name].append(info)
+                continue
+            # 快取命中與新計算的診斷資訊依視窗順序合併
+            if ks:
+                estimates = {k: e for k, _, e, _ in batch}
+                for k, row in zip(ks, info.to_dict('records')):
+                    rows[s.name][k] = row
+                    store(s, k, estimates[k], row)
+            diagnostics[s.name].append(pd.DataFrame([rows[s.name][k] for k in range(start, stop)]))
+    diagnostics = {name: pd.concat(infos, ignore_index=True) if infos else pd.DataFrame(columns=['method', 'cond'])
+                   for name, infos in diagnostics.items()}
+    return W, diagnostics
+
+# 行程池 worker 的狀態 (每個 worker 初始化一次)
+_WORKER = {}
+
+def _init_worker(shm_name, shape, dtype, assets, window, strategies, refresh_every, batch_size,
+                 trace=False, trace_memory=False, batched=True, cache=None, compute_cond=False):
+    shm, values = attach_shared(shm_name, shape, dtype)
+    _WORKER.update(shm=shm, values=values, assets=assets, window=window, strategies=strategies,
+                   refresh_every=refresh_every, batch_size=batch_size,
+                   trace=trace, trace_memory=trace_memory, batched=batched, cache=cache,
+                   compute_cond=compute_cond)
+
+def _run_chunk(points):
+    w = _WORKER
+    # 每個任務各自量測，連同結果回傳給主行程合併
+    tracer = Tracer(memory=w['trace_memory']) if w['trace'] else NULL_TRACER
+    cache = w['cache']
+    before = (0, 0) if cache is None else (cache.hits, cache.misses)
+    W, diagnostics = compute_weights(w['values'], w['assets'], w['window'], points,
+                                     w['strategies'], w['refresh_every'], w['batch_size'], tracer,
+                                     w['batched'], cache, w['compute_cond'])
+    # worker 的快取計數只存在於自己的複本，這個任務的增量交回主行程累加
+    stats = (0, 0) if cache is None else (cache.hits - before[0], cache.misses - before[1])
+    return W, diagnostics, tracer, stats
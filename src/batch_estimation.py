@@ -0,0 +1,147 @@
+"""
+視窗張量的批次估計：把 K 個訓練視窗視為 (K, T, N) 張量，
+以批次 NumPy 運算一次求出 K 個協方差、Ledoit-Wolf 收縮強度與 RMT 去噪結果，
+不必對每個視窗各自呼叫 sklearn / eigh (省去 K 次 Python 層的往返)。
+張量依記憶體預算 (budget bytes) 分塊處理。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.denoise import RMTDenoising, LedoitWolfDenoising
+from src.null_spectrum import fit_sigma2
+
+def window_view(values, window, points):
+    """
+    視窗 [t-window, t) (t in points) 的 (K, window, N) 張量
+    調倉點等距時為 values 的 strided view (不複製)，否則只複製選到的視窗
+    """
+    points = np.asarray(points)
+    views = sliding_window_view(values, window, axis=0).transpose(0, 2, 1) # (T-window+1, window, N)
+    starts = points - window
+    step = starts[1] - starts[0] if len(starts) > 1 else 1
+    if step > 0 and np.all(np.diff(starts) == step):
+        return views[starts[0] : starts[-1] + 1 : step]
+    return views[starts]
+
+def chunk_size(T, N, budget=2**28, itemsize=8):
+    """每塊視窗的個數，讓 (chunk, T, N) 張量與 (chunk, N, N) 矩陣約在 budget bytes 內"""
+    return max(1, int(budget // (itemsize * (T * N + 2 * N * N))))
+
+def batch_cov(X, ddof=1):
+    """(K, T, N) -> (K, N, N) 樣本協方差"""
+    Xc = X - X.mean(axis=1, keepdims=True)
+    return Xc.transpose(0, 2, 1) @ Xc / (X.shape[1] - ddof)
+
+def batch_corr(covs):
+    """(K, N, N) 協方差 -> 相關係數 (與 np.corrcoef 相同：截斷到 [-1, 1]、對角為 1)"""
+    d = np.sqrt(np.diagonal(covs, axis1=1, axis2=2))
+    corr = covs / d[:, :, np.newaxis] / d[:, np.newaxis, :]
+    np.clip(corr, -1, 1, out=corr)
+    corr[:, np.arange(covs.shape[1]), np.arange(covs.shape[1])] = 1.0
+    return corr
+
+def ledoit_wolf_batch(X, emp_cov=None):
+    """
+    K 個視窗的 Ledoit-Wolf 收縮估計 (與 sklearn.covariance.LedoitWolf 相同的閉式解)
+    X: (K, T, N) 視窗張量
+    emp_cov: 已算好的 (K, N, N) 協方差 (ddof=1，例如滑動視窗動差)，省去 O(K T N^2) 的乘積
+    shrinkage = min(beta, delta) / delta，其中
+      delta = ||S - mu I||_F^2 / N
+      beta  = (sum_t ||x_t||^4 / T - ||S||_F^2) / (N T)
+    回傳 ((K, N, N) 收縮後的協方差 (ddof=0), (K,) 收縮強度)
+    """
+    K, T, N = X.shape
+    Xc = X - X.mean(axis=1, keepdims=True)
+    if emp_cov is None:
+        emp = Xc.transpose(0, 2, 1) @ Xc / T
+    else:
+        emp = emp_cov * ((T - 1) / T)
+    diag = np.diagonal(emp, axis1=1, axis2=2)
+    mu = diag.sum(axis=1) / N
+    # sum(X2^T X2) = sum_t (sum_i x_ti^2)^2，只需 O(T N)
+    beta_ = ((Xc**2).sum(axis=2)**2).sum(axis=1)
+    delta_ = (emp**2).sum(axis=(1, 2))
+    beta = (beta_ / T - delta_) / (N * T)
+    delta = (delta_ - 2 * mu * diag.sum(axis=1) + N * mu**2) / N
+    beta = np.minimum(beta, delta)
+    shrinkage = np.divide(beta, delta, out=np.zeros_like(beta), where=beta != 0)
+    cov = (1 - shrinkage)[:, np.newaxis, np.newaxis] * emp
+    idx = np.arange(N)
+    cov[:, idx, idx] += (shrinkage * mu)[:, np.newaxis]
+    return cov, shrinkage
+
+def rmt_clean_batch(corrs, T, rmt=None, X=None, eig=None):
+    """
+    K 個相關係數矩陣的 RMT 去噪 (一次批次 eigh)，結果與 RMTDenoising.fit_corr + transform 相同
+    rmt: 提供界限設定的 RMTDenoising (method='full')；fit_sigma2 或 surrogate='shuffle' 時逐一視窗計算界限
+    X: (K, T, N) 視窗張量，只有 surrogate='shuffle' 需要
+    eig: 已算好的 ((K, N) 特徵值, (K, N, N) 特徵向量)，多個 RMT 設定共用同一次分解
+    回傳 ((K, N, N) 去噪後的相關係數, (K,) 訊號特徵值個數)
+    """
+    rmt = RMTDenoising() if rmt is None else rmt
+    K, N, _ = corrs.shape
+    evals, evecs = np.linalg.eigh(corrs) if eig is None else eig
+    if rmt.fit_sigma2 or (rmt.edge == 'monte_carlo' and rmt.surrogate == 'shuffle'):
+        lambda_max = np.empty(K)
+        for k in range(K):
+            if rmt.fit_sigma2:
+                rmt.sigma2 = fit_sigma2(evals[k], T / N)
+            rmt._set_bounds(T, N, None if X is None else X[k])
+            lambda_max[k] = rmt.lambda_max
+    else:
+        rmt._set_bounds(T, N)
+        lambda_max = np.full(K, rmt.lambda_max)
+    # 超過 lambda_max 的特徵值保留，其餘替換為雜訊平均 (沒有訊號時不處理，與 transform 相同)
+    noise = evals <= lambda_max[:, np.newaxis]
+    n_signals = N - noise.sum(axis=1)
+    noise &= (n_signals > 0)[:, np.newaxis]
+    noise_mean = (evals * noise).sum(axis=1) / np.maximum(noise.sum(axis=1), 1)
+    evals = np.where(noise, noise_mean[:, np.newaxis], evals)
+    corr = (evecs * evals[:, np.newaxis, :]) @ evecs.transpose(0, 2, 1)
+    # 對角線正規化 (設回 1)
+    d = 1 / np.sqrt(np.diagonal(corr, axis1=1, axis2=2))
+    return corr * d[:, :, np.newaxis] * d[:, np.newaxis, :], n_signals
+
+def is_batchable(denoise_method):
+    """可批次估計的去噪方法：'LW' / 'RMT' / LedoitWolfDenoising / method='full' 的 RMTDenoising"""
+    if isinstance(denoise_method, str):
+        return denoise_method in ('LW', 'RMT')
+    if isinstance(denoise_method, RMTDenoising):
+        return denoise_method.method == 'full'
+    return isinstance(denoise_method, LedoitWolfDenoising)
+
+def _is_lw(denoise_method):
+    return denoise_method == 'LW' or isinstance(denoise_method, LedoitWolfDenoising)
+
+def denoise_batch(X, denoise_method, covs=None, corrs=None, eig=None):
+    """
+    一批視窗的去噪協方差
+    X: (K, T, N) 視窗張量; covs / corrs: 已算好的協方差與相關係數 (None 則由 X 計算)
+    eig: 已算好的 corrs 批次特徵值分解 (RMT 使用)
+    回傳 ((K, N, N) 協方差, (K,) LW 收縮強度或 RMT 訊號特徵值個數)
+    """
+    if covs is None:
+        covs = batch_cov(X)
+    if _is_lw(denoise_method):
+        return ledoit_wolf_batch(X, covs)
+    if corrs is None:
+        corrs = batch_corr(covs)
+    rmt = denoise_method if isinstance(denoise_method, RMTDenoising) else RMTDenoising()
+    corr_clean, n_signals = rmt_clean_batch(corrs, X.shape[1], rmt, X, eig)
+    # Cov = D * Corr * D
+    std = np.sqrt(np.diagonal(covs, axis1=1, axis2=2))
+    return std[:, :, np.newaxis] * corr_clean * std[:, np.newaxis, :], n_signals
+
+def rolling_covariances(values, window, points, denoise_method=None, budget=2**28):
+    """
+    整段回測的 (去噪) 協方差：依記憶體預算分塊，每塊以幾個批次運算完成
+    denoise_method: None (樣本協方差) / 'LW' / 'RMT' / 設定好參數的去噪物件
+    產生 (該塊的調倉點, (k, N, N) 協方差)
+    """
+    values = np.asarray(values)
+    points = np.asarray(points)
+    n = chunk_size(window, values.shape[1], budget, values.itemsize)
+    for lo in range(0, len(points), n):
+        pts = points[lo : lo+n]
+        X = window_view(values, window, pts)
+        covs = batch_cov(X)
+        yield pts, covs if denoise_method is None else denoise_batch(X, denoise_method, covs)[0]
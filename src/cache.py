@@ -0,0 +1,134 @@
+"""
+以內容定址 (content-addressed) 的磁碟快取：每個項目以
+「數據切片的雜湊 + 估計器 / 優化器參數 + 程式碼版本」為鍵，
+儲存為未壓縮的 .npz (只含 ndarray，不使用 pickle)，總大小超過上限時依最近使用時間 (LRU) 淘汰。
+"""
+import glob
+import hashlib
+import inspect
+import os
+import tempfile
+import numpy as np
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_CODE_VERSION = None
+
+def code_version():
+    """src/ 所有原始碼的雜湊：程式碼一改，舊的快取項目就不再命中"""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        h = hashlib.blake2b(digest_size=16)
+        for path in sorted(glob.glob(os.path.join(_SRC_DIR, '*.py'))):
+            h.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        _CODE_VERSION = h.hexdigest()
+    return _CODE_VERSION
+
+def hash_array(a):
+    """陣列內容 (含形狀與型別) 的雜湊"""
+    a = np.ascontiguousarray(a)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{a.dtype.str}{a.shape}".encode())
+    h.update(a.data)
+    return h.hexdigest()
+
+def fingerprint(obj):
+    """
+    去噪方法 / 優化器的參數指紋：None 與字串直接使用，
+    物件以類別名稱加上 __init__ 參數的目前值表示 (擬合後的狀態不計入)
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return repr(obj)
+    params = [name for name in inspect.signature(type(obj).__init__).parameters if name != 'self']
+    values = ', '.join(f"{name}={getattr(obj, name, None)!r}" for name in params)
+    return f"{type(obj).__name__}({values})"
+
+class DiskCache:
+    """
+    磁碟快取
+    path: 快取目錄; max_bytes: 大小上限 (超過時刪除最久未使用的項目)
+    get(key) -> {名稱: ndarray} 或 None; put(key, **arrays)
+    寫入先寫暫存檔再 os.replace，多個行程 (平行回測的 worker) 可以共用同一個目錄。
+    """
+    def __init__(self, path='.cache', max_bytes=2**30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, *parts):
+        """由任意可 repr 的部分 (加上程式碼版本) 組成快取鍵"""
+        h = hashlib.blake2b(digest_size=20)
+        h.update(code_version().encode())
+        h.update(repr(parts).encode())
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + '.npz')
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            self.misses += 1
+            return None
+        # 以修改時間記錄最近使用時間 (LRU)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return arrays
+
+    def put(self, key, **arrays):
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self._written += os.path.getsize(path)
+        # 每寫入約上限的 1/16 才掃描一次目錄
+        if self._written > self.max_bytes / 16:
+            self._written = 0
+            self.evict()
+
+    def entries(self):
+        """[(最近使用時間, 大小, 路徑)]"""
+        out = []
+        for path in glob.glob(os.path.join(self.path, '*', '*.npz')):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """刪除最久未使用的項目，直到總大小不超過 max_bytes (預設為 self.max_bytes)"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def clear(self):
+        self.evict(0)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self.size(), 'max_bytes': self.max_bytes}
@@ -0,0 +1,193 @@
+"""
+SpectraPort 命令列入口 (以 JSON 設定檔驅動，可在無螢幕的伺服器上執行)
+用法: python -m src.cli configs/default.json [--no-plots] [--show] [--output-dir DIR] [--n-jobs N] [--no-cache]
+設定檔欄位見 configs/default.json；未指定的欄位使用 DEFAULTS。
+只在開啟繪圖時才載入 matplotlib / seaborn。
+"""
+import argparse
+import copy
+import json
+import os
+import pandas as pd
+from src.backtest import RollingBacktest, Strategy
+from src.data_loader import DataLoader
+from src.denoise import RMTDenoising, LedoitWolfDenoising
+from src.metrics import performance_metrics, bootstrap_ci
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+from src.providers import FileProvider, YFinanceProvider
+
+DEFAULTS = {
+    'universe': [],
+    'start_date': None,
+    'end_date': None,
+    'data': {'dir': 'data', 'provider': 'yfinance'},
+    'backtest': {'window': 252, 'rebalance_freq': 21, 'n_jobs': 1, 'dtype': 'float64'},
+    'cache': {'dir': None, 'max_mb': 1024},
+    'strategies': [],
+    'benchmark': 'Equal Weight',
+    'output': {'dir': 'output', 'metrics': 'metrics.csv', 'returns': None, 'bootstrap': None, 'trace': None},
+    'plots': {'enabled': False, 'show': False, 'dpi': 150, 'spectrum': None, 'spectrum_days': 252,
+              'cumulative_returns': None, 'weights_comparison': None},
+}
+
+def _merge(base, override):
+    out = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+def load_config(path):
+    """讀取 JSON 設定檔並補上預設值"""
+    with open(path) as f:
+        return _merge(DEFAULTS, json.load(f))
+
+def load_universe(spec):
+    """股票池：代碼列表，或 {"file": 路徑} (每行一個代碼)"""
+    if isinstance(spec, dict):
+        with open(spec['file']) as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return list(spec)
+
+def build_provider(spec):
+    """資料來源："yfinance" 或 {"type": "file", "path": CSV 路徑}"""
+    if isinstance(spec, dict) and spec.get('type') == 'file':
+        return FileProvider(spec['path'])
+    if spec in (None, 'yfinance'):
+        return YFinanceProvider()
+    raise ValueError(f"Unknown provider: {spec}")
+
+def build_denoiser(spec):
+    """去噪方法：null / "RMT" / "LW"，或 {"type": "RMT", 其餘為 RMTDenoising 的參數}"""
+    if spec is None or isinstance(spec, str):
+        return spec
+    params = dict(spec)
+    kind = params.pop('type')
+    if kind == 'RMT':
+        return RMTDenoising(**params)
+    elif kind == 'LW':
+        return LedoitWolfDenoising(**params)
+    raise ValueError(f"Unknown denoiser: {kind}")
+
+def build_optimizer(spec):
+    """優化器："gmvp" / "hrp"，或 {"type": "gmvp", 其餘為優化器的參數}"""
+    params = {'type': spec} if isinstance(spec, str) else dict(spec)
+    kind = params.pop('type').lower()
+    if kind == 'gmvp':
+        return MeanVarianceOptimizer(**params)
+    elif kind == 'hrp':
+        return HRPOptimizer(**params)
+    raise ValueError(f"Unknown optimizer: {kind}")
+
+def build_strategies(specs):
+    return [Strategy(s['name'], build_optimizer(s.get('optimizer', 'gmvp')), build_denoiser(s.get('denoise')))
+            for s in specs]
+
+def run(config):
+    """
+    依設定檔執行：載入數據 -> 滾動回測 -> 績效表 (-> bootstrap 信賴區間 / 圖表)
+    回傳 (樣本外報酬 DataFrame, 績效表 DataFrame)
+    """
+    out_cfg, plot_cfg, bt_cfg = config['output'], config['plots'], config['backtest']
+    out_dir = out_cfg['dir']
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = lambda name: None if not name else os.path.join(out_dir, name)
+    # 1. 載入數據
+    print("1. Loading Data...")
+    loader = DataLoader(load_universe(config['universe']), config['start_date'], config['end_date'],
+                        data_dir=config['data']['dir'], provider=build_provider(config['data']['provider']))
+    returns = loader.get_returns(loader.fetch_data())
+    print(f"   Data Shape: {returns.shape}")
+    plotting = None
+    if plot_cfg['enabled']:
+        if not plot_cfg['show']:
+            # 不開視窗時使用非互動式後端 (無螢幕的伺服器也能存檔)
+            import matplotlib
+            matplotlib.use('Agg')
+        from src import plotting
+    # 2. RMT 頻譜 (只在需要圖表時計算)
+    if plotting is not None and plot_cfg['spectrum']:
+        print("2. Generating RMT Spectrum Analysis...")
+        rmt = RMTDenoising().fit(returns.iloc[:plot_cfg['spectrum_days']])
+        plotting.plot_spectrum(rmt, out_path(plot_cfg['spectrum']), plot_cfg['show'], plot_cfg['dpi'])
+    # 3. 滾動回測
+    print(f"3. Running Rolling Window Backtest (Window={bt_cfg['window']}, Rebalance={bt_cfg['rebalance_freq']})...")
+    tracer = None
+    if out_cfg['trace']:
+        from src.tracing import Tracer
+        tracer = Tracer()
+    cache = None
+    if config['cache']['dir']:
+        # 每個視窗的估計與權重存到磁碟，重跑或只改一個策略時其餘結果直接讀取
+        from src.cache import DiskCache
+        cache = DiskCache(config['cache']['dir'], max_bytes=int(config['cache']['max_mb'] * 2**20))
+    bt = RollingBacktest(returns, window=bt_cfg['window'], rebalance_freq=bt_cfg['rebalance_freq'],
+                         dtype=bt_cfg['dtype'], tracer=tracer, cache=cache)
+    strategy_results, _ = bt.run_strategies(build_strategies(config['strategies']), n_jobs=bt_cfg['n_jobs'])
+    if cache is not None:
+        info = cache.info()
+        print(f"   Cache: {info['hits']} hits, {info['misses']} misses, {info['bytes'] / 2**20:.1f} MB")
+    results = strategy_results
+    if config['benchmark']:
+        # Benchmark (對齊回測開始後的時間段)
+        ew = returns.mean(axis=1)
+        ew.name = config['benchmark']
+        results = pd.concat([ew.loc[strategy_results.index], strategy_results], axis=1)
+    # 4. 績效表
+    print("\n=== Performance Metrics ===")
+    metrics = performance_metrics(results, bt.weights_history)
+    pct = lambda x: f"{x:.2%}"
+    print(metrics.to_string(formatters={'Return': pct, 'Volatility': pct, 'Max Drawdown': pct},
+                            float_format=lambda x: f"{x:.2f}"))
+    if out_cfg['metrics']:
+        metrics.to_csv(out_path(out_cfg['metrics']))
+    if out_cfg['returns']:
+        results.to_csv(out_path(out_cfg['returns']))
+    if out_cfg['bootstrap']:
+        print("\n=== Bootstrap 95% CI (Stationary, 5000 resamples) ===")
+        ci = bootstrap_ci(results, n_boot=5000, benchmark=config['benchmark'] or None)
+        print(ci.round(3).to_string())
+        ci.to_csv(out_path(out_cfg['bootstrap']))
+    if tracer is not None:
+        tracer.to_chrome_trace(out_path(out_cfg['trace']))
+    # 5. 圖表
+    if plotting is not None:
+        if plot_cfg['cumulative_returns']:
+            plotting.plot_cumulative_returns(results, out_path(plot_cfg['cumulative_returns']),
+                                             plot_cfg['show'], plot_cfg['dpi'])
+        compare = plot_cfg['weights_comparison']
+        if compare:
+            # 取最後一次調倉的權重
+            weights = {f"{name} Weights": bt.weights_history[name][-1] for name in compare['strategies']}
+            plotting.plot_weights_comparison(weights, out_path(compare['path']), plot_cfg['show'], plot_cfg['dpi'])
+    return results, metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config', help='JSON 設定檔')
+    parser.add_argument('--no-plots', action='store_true', help='不產生圖表 (不載入 matplotlib)')
+    parser.add_argument('--show', action='store_true', help='以視窗顯示圖表')
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true', help='不使用磁碟快取')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.no_plots:
+        config['plots']['enabled'] = False
+    if args.show:
+        config['plots']['show'] = True
+    if args.output_dir:
+        config['output']['dir'] = args.output_dir
+    if args.n_jobs is not None:
+        config['backtest']['n_jobs'] = args.n_jobs
+    if args.no_cache:
+        config['cache']['dir'] = None
+    print("=== EigenRisk: Portfolio Optimization Framework ===")
+    run(config)
+    print(f"\nDone! Check the '{config['output']['dir']}' folder.")
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,23 @@ import numpy as np
 import pandas as pd
 import scipy.cluster.hierarchy as sch
 from scipy.spatial.distance import squareform
+from src.denoise import FactorCovariance
 
 class HierarchicalClustering:
     """
     實作階層風險平價 (HRP) 所需的分群與排序演算法
     """
     @staticmethod
-    def get_linkage(corr):
-        """產生連結矩陣 (Linkage Matrix)"""
+    def get_distance(corr):
+        """相關係數距離矩陣"""
         # 距離定義：d = sqrt(0.5 * (1 - rho))
-        dist = np.sqrt(0.5 * (1 - corr))
+        return np.sqrt(0.5 * (1 - corr))
+
+    @staticmethod
+    def get_linkage(corr=None, dist=None):
+        """產生連結矩陣 (Linkage Matrix)，可直接傳入已算好的距離矩陣"""
+        if dist is None:
+            dist = HierarchicalClustering.get_distance(corr)
         link = sch.linkage(squareform(dist), 'single')
         return link
 
@@ -19,49 +26,57 @@ class HierarchicalClustering:
     def get_quasi_diag(link):
         """
         Quasi-Diagonalization: 重排矩陣順序，將相似資產放在一起
+        即樹狀圖由左至右的葉節點順序 (整數索引)
         """
-        link = link.astype(int)
-        sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
-        num_items = link[-1, 3]
-        while sort_ix.max() >= num_items:
-            sort_ix.index = range(0, sort_ix.shape[0] * 2, 2)
-            df0 = sort_ix[sort_ix >= num_items]
-            i = df0.index
-            j = df0.values - num_items
-            sort_ix[i] = link[j, 0]
-            df0 = pd.Series(link[j, 1], index=i + 1)
-            sort_ix = pd.concat([sort_ix, df0])
-            sort_ix = sort_ix.sort_index()
-            sort_ix.index = range(sort_ix.shape[0])         
-        return sort_ix.tolist()
+        return sch.leaves_list(link).tolist()
 
     @staticmethod
     def get_rec_bisection(cov, sort_ix):
         """
         遞迴二分法 (Recursive Bisection): 自上而下分配權重
+        cov: 已依 sort_ix 重排的協方差 (DataFrame)，回傳以 sort_ix 為 index 的權重
+        """
+        w = HierarchicalClustering.get_rec_bisection_array(cov.values)
+        return pd.Series(w, index=sort_ix)
+
+    @staticmethod
+    def get_rec_bisection_array(cov_sorted):
+        """
+        遞迴二分法的 NumPy 版本
+        cov_sorted: 已依 quasi-diag 順序重排的協方差 (ndarray 或 FactorCovariance)
+        每個子群組都是排序後的一段連續位置 [start, stop)，直接以切片取子矩陣，
+        回傳依排序位置排列的權重陣列。
         """
-        w = pd.Series(1.0, index=sort_ix)
-        c_items = [sort_ix]
+        w = np.ones(cov_sorted.shape[0])
+        c_items = [(0, len(w))]
         while len(c_items) > 0:
-            c_items = [i[j:k] for i in c_items for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if len(i) > 1]
+            c_items = [span for a, b in c_items if b - a > 1
+                       for span in ((a, a + (b - a) // 2), (a + (b - a) // 2, b))]
             for i in range(0, len(c_items), 2):
-                c_items0 = c_items[i]   # 左子樹
-                c_items1 = c_items[i + 1] # 右子樹
-                c_var0 = HierarchicalClustering._get_cluster_var(cov, c_items0)
-                c_var1 = HierarchicalClustering._get_cluster_var(cov, c_items1)
+                a0, b0 = c_items[i]     # 左子樹
+                a1, b1 = c_items[i + 1] # 右子樹
+                c_var0 = HierarchicalClustering._get_cluster_var(cov_sorted, a0, b0)
+                c_var1 = HierarchicalClustering._get_cluster_var(cov_sorted, a1, b1)
                 alpha = 1 - c_var0 / (c_var0 + c_var1)
-                w[c_items0] *= alpha
-                w[c_items1] *= 1 - alpha     
+                w[a0:b0] *= alpha
+                w[a1:b1] *= 1 - alpha
         return w
 
     @staticmethod
-    def _get_cluster_var(cov, c_items):
-        """計算群組內的變異數 (Inverse Variance Allocation)"""
-        cov_slice = cov.loc[c_items, c_items]
+    def _get_cluster_var(cov, start, stop):
+        """計算群組 [start, stop) 內的變異數 (Inverse Variance Allocation)"""
+        if isinstance(cov, FactorCovariance):
+            # 因子結構：w^T Sigma w = |F^1/2 B^T w|^2 + sum(d w^2)，不展開子矩陣
+            cov_slice = cov.take(slice(start, stop))
+            ivp = 1 / cov_slice.diag()
+            ivp /= ivp.sum()
+            return cov_slice.quad_form(ivp)
+        # 複製成 Fortran 順序 (與 pandas 的區塊佈局相同)，使浮點結果與 pandas 版本逐位元一致
+        cov_slice = np.asfortranarray(cov[start:stop, start:stop])
         # 計算群組內各資產的IVP權重
         ivp = 1 / np.diag(cov_slice)
         ivp /= ivp.sum()
         # V_cluster = w^T * Cov * w
         w = ivp.reshape(-1, 1)
         c_var = np.dot(np.dot(w.T, cov_slice), w)[0, 0]
-        return c_var
\ No newline at end of file
+        return c_var
@@ -1,33 +1,100 @@
-import yfinance as yf
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import os
+from src.price_store import PriceStore
+from src.providers import YFinanceProvider
 
 class DataLoader:
-    def __init__(self, tickers, start_date, end_date, data_dir='data'):
+    """
+    provider: 價格資料來源 (預設 YFinanceProvider；離線測試可用 FileProvider)
+    只抓取資料庫中缺少的 (股票, 日期區間)，以有限並行數分批下載並重試。
+    empty_ttl: 來源沒有回傳數據的 (股票, 區間) 在這段時間內不再請求，之後重試
+               (yfinance 下載失敗時不會丟出例外，只回傳缺值，不能記為已抓取)
+    """
+    def __init__(self, tickers, start_date, end_date, data_dir='data', provider=None,
+                 batch_size=50, max_workers=4, max_retries=3, retry_delay=1.0, empty_ttl='1D'):
         self.tickers = tickers
         self.start_date = start_date
         self.end_date = end_date
         self.data_dir = data_dir
+        self.provider = YFinanceProvider() if provider is None else provider
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.empty_ttl = pd.Timedelta(empty_ttl)
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+        # 欄式價格資料庫 (依股票與日期區間快取)
+        self.store = PriceStore(os.path.join(data_dir, 'prices'))
+
+    def find_gaps(self):
+        """
+        找出尚未抓取的區間，相同缺口的股票合併成一批 (最近請求過但沒有數據的區間跳過)。
+        回傳 [(start, end, [tickers...]), ...]，每批最多 batch_size 檔股票
+        """
+        groups = defaultdict(list)
+        for ticker in self.tickers:
+            for gap in self.store.missing_ranges(ticker, self.start_date, self.end_date):
+                if not self.store.recently_empty(ticker, *gap, self.empty_ttl):
+                    groups[gap].append(ticker)
+        batches = []
+        for (start, end), tickers in sorted(groups.items()):
+            for i in range(0, len(tickers), self.batch_size):
+                batches.append((start, end, tickers[i : i+self.batch_size]))
+        return batches
+
+    def _fetch_with_retry(self, start, end, tickers):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.provider.fetch(tickers, start, end)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Fetch failed for {len(tickers)} tickers [{start.date()}, {end.date()}): {e}")
+                    return None
+                # 指數退避 (exponential backoff)
+                time.sleep(self.retry_delay * 2**attempt)
+
+    def update(self):
+        """只下載缺口並合併進資料庫 (每日更新時只會抓最新一天)"""
+        batches = self.find_gaps()
+        if not batches:
+            return 0
+        print(f"Fetching {len(batches)} batches ({sum(len(b[2]) for b in batches)} ticker ranges)...")
+        # 今天的收盤價尚未定案，coverage 最多記到今天 (不含)，下次更新會再抓一次
+        today = pd.Timestamp.today().normalize()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_with_retry, *batch) for batch in batches]
+            # 依提交順序在主執行緒寫入，資料庫不需處理並行寫入
+            for (start, end, tickers), future in zip(batches, futures):
+                df = future.result()
+                if df is None:
+                    continue
+                if min(end, today) > start:
+                    empty = self.store.write(df, start, min(end, today), tickers=tickers)
+                    if empty:
+                        print(f"No data for {len(empty)} tickers [{start.date()}, {end.date()}), "
+                              f"will retry after {self.empty_ttl}")
+                else:
+                    self.store.write(df)
+        return len(batches)
 
     def fetch_data(self):
         """下載或讀取快取數據"""
-        file_path = os.path.join(self.data_dir, 'stock_prices.csv')
-        if os.path.exists(file_path):
-            print(f"Loading data from {file_path}...")
-            df = pd.read_csv(file_path, index_col=0, parse_dates=True)
-        else:
-            print("Downloading data from Yahoo Finance...")
-            df = yf.download(self.tickers, start=self.start_date, end=self.end_date)['Close']
-            # 簡單清洗：刪除缺失值過多的股票
-            df = df.dropna(axis=1, thresh=int(len(df)*0.9)) 
-            df = df = df.ffill().bfill()
-            df.to_csv(file_path)
+        self.update()
+        print(f"Loading data from {self.store.root}...")
+        df = self.store.load(self.tickers, self.start_date, self.end_date)
+        # 去掉這個股票池完全沒有報價的日期 (資料庫可能含其他股票池的交易日)
+        df = df.dropna(how='all')
+        # 簡單清洗：刪除缺失值過多的股票
+        df = df.dropna(axis=1, thresh=int(len(df)*0.9))
+        df = df.ffill().bfill()
         return df
 
     def get_returns(self, df):
         """計算百分比報酬率 (Raw Returns)"""
         # 這裡不標準化，保留原始波動，供回測使用
-        return df.pct_change().dropna()
\ No newline at end of file
+        return df.pct_change().dropna()
@@ -1,48 +1,261 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.covariance import LedoitWolf
+from src.null_spectrum import null_spectrum, fit_sigma2
 
-# 設定繪圖風格
-sns.set_style('whitegrid')
+# sklearn 與繪圖套件載入很慢，只在實際用到時才 import (純計算的批次工作不需要它們)
 
 class RMTDenoising:
     """
     基於隨機矩陣理論 (RMT) 的去噪器。
     參考 Marchenko-Pastur 定律來過濾雜訊特徵值。
+    method:
+      'full'       : 建立 N x N 相關係數矩陣並做完整 eigh (transform 回傳稠密矩陣)
+      'svd'        : 對標準化後的 T x N 數據做薄 SVD，只保留訊號特徵向量
+      'randomized' : 隨機化部分 SVD，只求前幾個特徵值 (N >> T 時最快)
+      'tracking'   : 追蹤模式，以上一次 fit 的訊號子空間 (加 n_guard 個保護向量) 暖啟動，
+                     以 block LOBPCG (Rayleigh-Ritz) 只精修前 k + n_guard 個特徵對，每次 O(N^2 k)；
+                     訊號個數改變、保護向量越過 lambda_max 或 max_iter 次內未收斂時退回完整 eigh。
+                     狀態跨視窗保留 (path_dependent)，transform 回傳稠密矩陣
+    低秩模式的 transform 回傳 LowRankCorrelation，記憶體由 O(N^2) 降為 O(N k)。
+    雜訊上界 (lambda_max):
+      edge='analytic'    : MP 理論公式 sigma2 * (1 + sqrt(N/T))^2
+      edge='monte_carlo' : n_surrogates 個無相關代理矩陣 (surrogate='gaussian' 或 'shuffle') 的
+                           最大特徵值取 edge_quantile 分位數，再乘上 sigma2 (見 src.null_spectrum)
+    fit_sigma2=True 時由數據估計雜訊變異數 sigma2 (預設固定為 1)：
+      full 模式以 MP 密度擬合全部特徵值；低秩與追蹤模式只有前幾個特徵值，改以跡反推
+      (sigma2 = 1 - 訊號特徵值總和 / N，反覆更新到收斂)
     """
-    def __init__(self, alpha=2.0):
+    def __init__(self, alpha=2.0, method='full', n_components=10, random_state=0,
+                 edge='analytic', n_surrogates=200, surrogate='gaussian', edge_quantile=0.95,
+                 fit_sigma2=False, n_jobs=1, n_guard=5, tol=1e-10, max_iter=100):
         self.alpha = alpha
+        self.method = method
+        self.n_components = n_components # randomized 模式的初始特徵值個數 (不足時加倍)
+        self.random_state = random_state
+        self.edge = edge
+        self.n_surrogates = n_surrogates
+        self.surrogate = surrogate
+        self.edge_quantile = edge_quantile
+        self.fit_sigma2 = fit_sigma2
+        self.n_jobs = n_jobs # 代理矩陣頻譜的平行行程數
+        self.n_guard = n_guard # 追蹤模式：訊號子空間外多追蹤的特徵向量個數
+        self.tol = tol # 追蹤模式：Ritz 向量殘差 ||C v - θ v|| 的相對容忍度
+        self.max_iter = max_iter
+        self.subspace_ = None
+        self.n_tracked_ = 0 # 追蹤成功 (未退回完整 eigh) 的次數
+        self.n_fallbacks_ = 0
         self.eigenvalues_ = None
         self.eigenvectors_ = None
         self.lambda_max = None
         self.lambda_min = None
         self.q = None
         self.sigma2 = 1
-    
-    def fit(self, X):
+
+    @property
+    def path_dependent(self):
+        """追蹤模式的結果依賴上一次 fit 的子空間 (在容忍度內)，回測會依序計算"""
+        return self.method == 'tracking'
+
+    def reset_subspace(self):
+        """清除追蹤模式保留的子空間與計數 (下一次 fit 以完整 eigh 重新開始)"""
+        self.subspace_ = None
+        self.n_tracked_ = 0
+        self.n_fallbacks_ = 0
+
+    def fit(self, X, T=None):
         """
         計算特徵值並擬合 MP 分佈。
         X: 標準化後的收益率矩陣 (T x N) 或 DataFrame
+        T: MP 界限所用的樣本數 (None 代表 X 的列數；加權數據時傳入有效樣本數)
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        T, N = X.shape
-        self.q = T / N
+        if T is None:
+            T = X.shape[0]
+        if self.method not in ('full', 'tracking'):
+            return self._fit_low_rank(X, T)
         # 1. 計算經驗相關係數矩陣
-        self.corr_matrix = np.corrcoef(X, rowvar=False)
+        return self.fit_corr(np.corrcoef(X, rowvar=False), T, X=X)
+
+    def fit_corr(self, corr, T, eig=None, X=None):
+        """
+        直接以相關係數矩陣擬合 (例如滑動視窗動差已算好的 corr)。
+        corr: N x N 相關係數矩陣, T: 估計所用的樣本數
+        eig: 已算好的 (eigenvalues, eigenvectors)，可省去重複的特徵值分解 (追蹤模式不使用)
+        X: 原始數據 (T x N)，只有 surrogate='shuffle' 需要
+        """
+        N = corr.shape[0]
+        self.n_features_ = N
+        self.corr_matrix = corr
+        if self.method == 'tracking':
+            return self._fit_tracking(corr, T, X)
         # 2. 特徵值分解
-        self.eigenvalues_, self.eigenvectors_ = np.linalg.eigh(self.corr_matrix)
-        # 3. 計算 Marchenko-Pastur 界限（完整公式）
-        self.lambda_max = self.sigma2 * (1.0 + np.sqrt(1.0/self.q))**2
-        self.lambda_min = self.sigma2 * (1.0 - np.sqrt(1.0/self.q))**2
+        if eig is None:
+            eig = np.linalg.eigh(self.corr_matrix)
+        self.eigenvalues_, self.eigenvectors_ = eig
+        # 3. 計算 Marchenko-Pastur 界限 (可選擇以 MP 密度擬合 sigma2)
+        if self.fit_sigma2:
+            self.sigma2 = fit_sigma2(self.eigenvalues_, T / N)
+        self._set_bounds(T, N, X)
+        return self
+
+    def _set_bounds(self, T, N, X=None):
+        """計算雜訊特徵值的界限 (MP 公式，或 Monte-Carlo 代理矩陣的經驗界限)"""
+        self.q = T / N
+        if self.edge == 'monte_carlo':
+            spectra = null_spectrum(T, N, self.n_surrogates, self.surrogate, X=X,
+                                    seed=self.random_state, n_jobs=self.n_jobs)
+            self.null_spectra_ = spectra
+            # sigma2 = 1 時的經驗界限
+            self._edges = (np.quantile(spectra[:, 0], 1 - self.edge_quantile),
+                           np.quantile(spectra[:, -1], self.edge_quantile))
+        elif self.edge == 'analytic':
+            self._edges = ((1.0 - np.sqrt(1.0/self.q))**2, (1.0 + np.sqrt(1.0/self.q))**2)
+        else:
+            raise ValueError(f"Unknown edge: {self.edge}")
+        self._scale_bounds()
+
+    def _scale_bounds(self):
+        self.lambda_min = self.sigma2 * self._edges[0]
+        self.lambda_max = self.sigma2 * self._edges[1]
+
+    def _fit_bounds_low_rank(self, evals, N, max_iter=20):
+        """
+        低秩模式：以跡反推 sigma2 並更新界限
+        特徵值總和為 N，雜訊特徵值的平均 (即 MP 分佈的平均 sigma2) = (N - 訊號總和) / (N - k)
+        """
+        if not self.fit_sigma2:
+            return
+        for _ in range(max_iter):
+            signal = evals[evals > self.lambda_max]
+            sigma2 = (N - signal.sum()) / (N - len(signal))
+            if np.isclose(sigma2, self.sigma2, rtol=1e-6):
+                break
+            self.sigma2 = sigma2
+            self._scale_bounds()
+
+    def _fit_low_rank(self, X, T):
+        """
+        不建立 N x N 相關係數矩陣，直接由標準化數據 Z (Z^T Z = corr) 取得訊號特徵對。
+        corr 的秩至多為 X 的列數，特徵值即 Z 的奇異值平方 (T 只用於 MP 界限)。
+        eigenvalues_ 為已求得的特徵值 (遞增)，eigenvectors_ 只保留超過 lambda_max 的訊號特徵向量。
+        """
+        n, N = X.shape
+        self.n_features_ = N
+        self.corr_matrix = None
+        if self.fit_sigma2:
+            self.sigma2 = 1
+        self._set_bounds(T, N, X)
+        Z = (X - X.mean(axis=0)) / (X.std(axis=0, ddof=1) * np.sqrt(n - 1))
+        rank = min(n, N)
+        if self.method == 'svd':
+            _, s, Vt = np.linalg.svd(Z, full_matrices=False)
+            self._fit_bounds_low_rank(s**2, N)
+        elif self.method == 'randomized':
+            from sklearn.utils.extmath import randomized_svd
+            # 逐步加倍求解個數，直到最小的特徵值已落入雜訊區 (確保訊號特徵值全部找到)
+            k = min(self.n_components, rank)
+            while True:
+                _, s, Vt = randomized_svd(Z, n_components=k, n_iter=10,
+                                          random_state=self.random_state)
+                self._fit_bounds_low_rank(s**2, N)
+                if s[-1]**2 <= self.lambda_max or k == rank:
+                    break
+                k = min(2 * k, rank)
+        else:
+            raise ValueError(f"Unknown method: {self.method}")
+        evals = s**2
+        n_signals = np.sum(evals > self.lambda_max)
+        self.eigenvalues_ = evals[::-1]
+        self.eigenvectors_ = Vt[:n_signals][::-1].T
         return self
 
+    def _fit_tracking(self, corr, T, X=None):
+        """
+        追蹤模式：從上一次的子空間 (k 個訊號 + n_guard 個保護向量) 精修前幾個特徵對。
+        eigenvalues_ 為追蹤到的 k + n_guard 個特徵值 (遞增)，eigenvectors_ 只保留訊號特徵向量；
+        雜訊平均由跡反推 (見 _transform_tracking)，不需要其餘特徵值。
+        """
+        N = corr.shape[0]
+        if self.fit_sigma2:
+            self.sigma2 = 1
+        self._set_bounds(T, N, X)
+        self._trace = np.trace(corr)
+
+        def bound(evals):
+            # sigma2 每次從 1 開始以跡反推，結果只由特徵值決定
+            if self.fit_sigma2:
+                self.sigma2 = 1
+                self._scale_bounds()
+                self._fit_bounds_low_rank(evals, N)
+            return self.lambda_max
+
+        prev = self.subspace_
+        n_prev = 0 if self.eigenvectors_ is None else self.eigenvectors_.shape[1]
+        result = None
+        if prev is not None and prev.shape[0] == N:
+            result = self._track(corr, prev, bound)
+        if result is not None:
+            evals, evecs, self.iterations_ = result
+            n_signals = np.sum(evals > bound(evals))
+            # 訊號個數改變或保護向量也越過界限：可能有新的訊號不在子空間內
+            if n_signals != n_prev or n_signals == len(evals):
+                result = None
+        if result is None:
+            evals, evecs = np.linalg.eigh(corr)
+            self.iterations_ = 0
+            n_signals = np.sum(evals > bound(evals))
+            p = min(N, n_signals + self.n_guard)
+            evals, evecs = evals[N-p:], evecs[:, N-p:]
+            self.n_fallbacks_ += 1
+        else:
+            self.n_tracked_ += 1
+        self.subspace_ = evecs
+        self.eigenvalues_ = evals
+        self.eigenvectors_ = evecs[:, len(evals)-n_signals:]
+        return self
+
+    def _track(self, corr, X, bound):
+        """
+        Block LOBPCG：搜尋空間為 [目前的 Ritz 向量, 殘差, 上一步的搜尋方向]，
+        每次 Rayleigh-Ritz 取最大的 p 個 Ritz 對 (每次迭代一次 N x N 乘上 N x 3p 的矩陣乘法)。
+        只要求超過界限 bound(Ritz 值) 的 Ritz 向量收斂 (殘差 <= tol * 最大特徵值)；
+        回傳 (特徵值 (遞增), 特徵向量, 迭代次數)，未收斂時回傳 None
+        """
+        p = X.shape[1]
+        AX = corr @ X
+        theta, S = np.linalg.eigh(X.T @ AX)
+        X, AX = X @ S, AX @ S
+        P = None
+        for it in range(1, self.max_iter + 1):
+            R = AX - X * theta
+            res = np.linalg.norm(R, axis=0)
+            active = res > self.tol * theta[-1]
+            # 收斂判斷只看訊號 (以目前的界限估計，保護向量只需指出界限的位置)
+            if not active[theta > bound(theta)].any():
+                return theta, X, it
+            blocks = [X, R[:, active] / res[active]]
+            if P is not None:
+                blocks.append(P / np.maximum(np.linalg.norm(P, axis=0), np.finfo(float).tiny))
+            # Householder QR：前 p 欄張成 X，線性相依的方向只是多出來的正交向量，不影響 Rayleigh-Ritz
+            B, _ = np.linalg.qr(np.hstack(blocks))
+            AB = corr @ B
+            _, S = np.linalg.eigh(B.T @ AB)
+            S = S[:, -p:]
+            X, AX = B @ S, AB @ S
+            theta = np.einsum('ij,ij->j', X, AX)
+            # 新的搜尋方向：新 Ritz 向量在 X 以外的分量
+            P = B[:, p:] @ S[p:]
+        return None
+
     def transform(self, X=None):
         """執行去噪並重建矩陣"""
         if self.eigenvalues_ is None:
             raise ValueError("Run .fit() first!")
+        if self.method == 'tracking':
+            return self._transform_tracking()
+        if self.method != 'full':
+            return self._transform_low_rank()
         # 將超過 lambda_max 的特徵值保留，其餘替換為雜訊平均
         n_signals = np.sum(self.eigenvalues_ > self.lambda_max)
         eigenvalues_clean = self.eigenvalues_.copy()
@@ -58,31 +271,158 @@ class RMTDenoising:
         corr_clean = D_inv_sqrt @ corr_clean_raw @ D_inv_sqrt
         return corr_clean
 
-    def plot_spectrum(self):
-        """繪製特徵值分佈 vs MP 理論曲線"""
-        if self.eigenvalues_ is None:
-            raise ValueError("Run .fit() first!")
-        # 產生理論 PDF
-        x = np.linspace(self.lambda_min, self.lambda_max, 1000)
-        pdf = (self.q / (2 * np.pi * self.sigma2 * x)) * np.sqrt((self.lambda_max - x) * (x - self.lambda_min))
-        pdf = np.nan_to_num(pdf)
-        plt.figure(figsize=(10, 6))
-        plt.plot(x, pdf, color='orange', linewidth=3, label='Theoretical MP Law (Noise)')
-        # 為了視覺美觀，過濾掉超級大的 Market Mode 特徵值
-        evals_display = self.eigenvalues_[self.eigenvalues_ <= self.lambda_max * self.alpha]
-        plt.hist(evals_display, bins=50, density=True, alpha=0.6, color='steelblue', label='Empirical Eigenvalues')
-        plt.axvline(self.lambda_max, color='red', linestyle='--', label=f'Noise Upper Bound ({self.lambda_max:.2f})')
-        plt.title(f'Eigenvalue Spectrum (Q={self.q:.2f})')
-        plt.xlabel('Eigenvalue')
-        plt.ylabel('Probability Density')
-        plt.legend()
-        plt.show()
+    def _transform_tracking(self):
+        """
+        C = δ I + V (λ - δ) V^T，雜訊平均 δ = (trace(C) - 訊號特徵值總和) / (N - k)
+        (與完整特徵值分解時雜訊特徵值的平均相同)，O(N^2 k)
+        """
+        N = self.n_features_
+        V = self.eigenvectors_
+        k = V.shape[1]
+        evals = self.eigenvalues_[len(self.eigenvalues_)-k:]
+        if k == 0:
+            # 沒有訊號時不處理 (與 full 模式相同)
+            corr = np.array(self.corr_matrix, dtype=float)
+        else:
+            noise_mean = (self._trace - evals.sum()) / (N - k) if k < N else 0.0
+            corr = (V * (evals - noise_mean)) @ V.T
+            corr[np.diag_indices_from(corr)] += noise_mean
+        # 對角線正規化 (設回 1)
+        d = 1 / np.sqrt(np.diag(corr))
+        return corr * d[:, np.newaxis] * d[np.newaxis, :]
+
+    def _transform_low_rank(self):
+        """低秩去噪：k 個訊號因子 + 純量雜訊 (相關係數矩陣的跡為 N，雜訊平均由跡反推)"""
+        N = self.n_features_
+        signal = self.eigenvalues_ > self.lambda_max
+        evals = self.eigenvalues_[signal]
+        k = len(evals)
+        noise_mean = (N - evals.sum()) / (N - k) if k < N else 0.0
+        return LowRankCorrelation(self.eigenvectors_, evals, noise_mean)
+
+    def plot_spectrum(self, path=None, show=True):
+        """繪製特徵值分佈 vs MP 理論曲線 (見 src.plotting.plot_spectrum)"""
+        from src.plotting import plot_spectrum
+        return plot_spectrum(self, path=path, show=show)
+
+class LowRankCorrelation:
+    """
+    「k 個因子 + 純量雜訊」形式的去噪相關係數矩陣，不建立 N x N 稠密矩陣。
+    C = S (V diag(λ) V^T + δ (I - V V^T)) S
+    V: N x k 訊號特徵向量, λ: 訊號特徵值, δ: 雜訊平均, S: 讓對角線為 1 的縮放
+    """
+    def __init__(self, eigenvectors, eigenvalues, noise):
+        self.eigenvectors = eigenvectors
+        self.eigenvalues = eigenvalues
+        self.noise = noise
+        # 對角線正規化 (設回 1)
+        raw_diag = noise + (eigenvectors**2) @ (eigenvalues - noise)
+        self.scale = 1 / np.sqrt(raw_diag)
+
+    @property
+    def shape(self):
+        N = self.eigenvectors.shape[0]
+        return (N, N)
+
+    def dot(self, x):
+        """矩陣乘法 C @ x (x 為 N 或 N x m)，O(N k)"""
+        x = np.asarray(x)
+        y = self.scale[:, np.newaxis] * x.reshape(len(self.scale), -1)
+        proj = (self.eigenvalues - self.noise)[:, np.newaxis] * (self.eigenvectors.T @ y)
+        out = self.scale[:, np.newaxis] * (self.noise * y + self.eigenvectors @ proj)
+        return out.reshape(x.shape)
+
+    __matmul__ = dot
+
+    def to_dense(self):
+        """展開為 N x N 稠密矩陣 (僅供小型問題或比較使用)"""
+        V = self.eigenvectors * self.scale[:, np.newaxis]
+        corr = (V * (self.eigenvalues - self.noise)) @ V.T
+        corr[np.diag_indices_from(corr)] += self.noise * self.scale**2
+        return corr
+
+    def to_covariance(self, stds, index=None):
+        """
+        轉為 FactorCovariance: Cov = D * Corr * D
+        C = (S V)(λ - δ)(S V)^T + δ S^2，乘上標準差後仍是「因子 + 對角」結構
+        """
+        s = np.asarray(stds) * self.scale
+        return FactorCovariance(s[:, np.newaxis] * self.eigenvectors,
+                                self.eigenvalues - self.noise,
+                                self.noise * s**2, index=index)
+
+class FactorCovariance:
+    """
+    「因子 + 對角」結構的協方差矩陣：Sigma = B diag(f) B^T + diag(d)
+    B: N x k 因子負荷, f: k 個因子變異數, d: N 個特有變異數
+    RMT 去噪後的矩陣正是「低秩 + 對角」，以 Woodbury 恆等式求解只需 O(N k^2)。
+    """
+    def __init__(self, loadings, factor_variances, diagonal, index=None):
+        self.loadings = np.asarray(loadings)
+        self.factor_variances = np.asarray(factor_variances)
+        self.diagonal = np.asarray(diagonal)
+        self.index = pd.Index(range(len(self.diagonal)) if index is None else index)
+
+    @property
+    def shape(self):
+        N = len(self.diagonal)
+        return (N, N)
+
+    def diag(self):
+        return self.diagonal + (self.loadings**2) @ self.factor_variances
+
+    def dot(self, x):
+        """矩陣乘法 Sigma @ x (x 為 N 或 N x m)，O(N k)"""
+        x = np.asarray(x)
+        y = x.reshape(len(self.diagonal), -1)
+        proj = self.factor_variances[:, np.newaxis] * (self.loadings.T @ y)
+        out = self.diagonal[:, np.newaxis] * y + self.loadings @ proj
+        return out.reshape(x.shape)
+
+    __matmul__ = dot
+
+    def quad_form(self, w):
+        """w^T Sigma w"""
+        z = self.loadings.T @ w
+        return z @ (self.factor_variances * z) + w @ (self.diagonal * w)
+
+    def solve(self, b):
+        """
+        以 Woodbury 恆等式求解 Sigma x = b，不建立 N x N 矩陣：
+        Sigma^-1 = D^-1 - D^-1 B (I + F B^T D^-1 B)^-1 F B^T D^-1
+        (寫成 (I + F G)^-1 F 的形式，因子變異數為 0 時也不需 F^-1)
+        """
+        b = np.asarray(b)
+        y = b.reshape(len(self.diagonal), -1) / self.diagonal[:, np.newaxis]
+        Dinv_B = self.loadings / self.diagonal[:, np.newaxis]
+        f = self.factor_variances[:, np.newaxis]
+        M = np.eye(len(f)) + f * (self.loadings.T @ Dinv_B)
+        x = y - Dinv_B @ np.linalg.solve(M, f * (self.loadings.T @ y))
+        return x.reshape(b.shape)
+
+    def take(self, positions):
+        """取出子矩陣 Sigma[positions, positions] (仍為因子結構)"""
+        return FactorCovariance(self.loadings[positions], self.factor_variances,
+                                self.diagonal[positions], index=self.index[positions])
+
+    def select(self, labels):
+        """以資產名稱取出子矩陣，相當於 cov.loc[labels, labels]"""
+        return self.take(self.index.get_indexer(labels))
+
+    def to_dense(self):
+        cov = (self.loadings * self.factor_variances) @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.diagonal
+        return cov
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dense(), index=self.index, columns=self.index)
 
 class LedoitWolfDenoising:
     """
     Ledoit-Wolf 收縮估計 (對照組)
     """
     def __init__(self):
+        from sklearn.covariance import LedoitWolf
         self.lw = LedoitWolf()
         
     def fit(self, X):
@@ -0,0 +1,144 @@
+"""
+績效分析：所有策略一次以 2-D NumPy 運算完成 (T x S)，不逐欄迴圈。
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+def _values(returns):
+    return returns.values.astype(float), list(returns.columns)
+
+def _max_drawdown(R, axis=0):
+    """沿 axis 的最大回撤 (負值)"""
+    wealth = np.cumprod(1 + R, axis=axis)
+    return (wealth / np.maximum.accumulate(wealth, axis=axis) - 1).min(axis=axis)
+
+def _safe_div(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / np.where(b != 0, b, 1), 0.0)
+
+def turnover(weights):
+    """
+    平均每次調倉的換手率 sum(|w_k - w_{k-1}|)
+    weights: 權重列表 (pd.Series)、WeightsHistory 或 (K, N) 陣列
+    """
+    W = np.asarray(weights, dtype=float)
+    if len(W) < 2:
+        return 0.0
+    return np.abs(np.diff(W, axis=0)).sum(axis=1).mean()
+
+def performance_metrics(returns, weights_history=None, periods=252):
+    """
+    計算所有策略的績效指標 (年化)
+    returns: 日報酬 DataFrame (T x S)
+    weights_history: {策略名稱: 權重列表}，用來計算 Turnover (沒有權重的策略為 NaN)
+    """
+    R, names = _values(returns)
+    ann_ret = R.mean(axis=0) * periods
+    ann_vol = R.std(axis=0, ddof=1) * np.sqrt(periods)
+    downside = np.sqrt((np.minimum(R, 0)**2).mean(axis=0)) * np.sqrt(periods)
+    max_dd = _max_drawdown(R)
+    metrics = pd.DataFrame({
+        'Return': ann_ret,
+        'Volatility': ann_vol,
+        'Sharpe': _safe_div(ann_ret, ann_vol),
+        'Sortino': _safe_div(ann_ret, downside),
+        'Max Drawdown': max_dd,
+        'Calmar': _safe_div(ann_ret, np.abs(max_dd)),
+    }, index=pd.Index(names, name='Strategy'))
+    if weights_history is not None:
+        metrics['Turnover'] = [turnover(weights_history[n]) if n in weights_history else np.nan
+                               for n in names]
+    return metrics
+
+def rolling_metrics(returns, window=63, periods=252):
+    """
+    滾動視窗績效 (年化報酬、波動率、Sharpe、最大回撤)
+    以累積和計算滾動平均/變異數，回撤以 (視窗數, S, window) 的滑動視圖一次計算。
+    回傳欄位為 (指標, 策略) 的 MultiIndex DataFrame
+    """
+    R, names = _values(returns)
+    T = len(R)
+    c1 = np.vstack([np.zeros(R.shape[1]), np.cumsum(R, axis=0)])
+    c2 = np.vstack([np.zeros(R.shape[1]), np.cumsum(R**2, axis=0)])
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    mean = s1 / window
+    var = np.maximum(s2 - window * mean**2, 0) / (window - 1)
+    ann_ret = mean * periods
+    ann_vol = np.sqrt(var * periods)
+    max_dd = _max_drawdown(sliding_window_view(R, window, axis=0), axis=-1)
+    index = returns.index[window - 1 : T]
+    frames = {
+        'Return': ann_ret,
+        'Volatility': ann_vol,
+        'Sharpe': _safe_div(ann_ret, ann_vol),
+        'Max Drawdown': max_dd,
+    }
+    return pd.concat({k: pd.DataFrame(v, index=index, columns=names) for k, v in frames.items()}, axis=1)
+
+def bootstrap_indices(T, n_boot, method='stationary', block_size=None, rng=None):
+    """
+    產生 (n_boot, T) 的重抽樣索引 (保留時間序列的自相關)
+    'stationary': Politis-Romano 平穩 bootstrap，區塊長度服從平均為 block_size 的幾何分佈
+    'block'     : 固定長度 block_size 的移動區塊 bootstrap
+    """
+    rng = np.random.default_rng(rng)
+    if block_size is None:
+        block_size = max(1, int(round(T ** (1 / 3))))
+    if method == 'stationary':
+        new_block = rng.random((n_boot, T)) < 1.0 / block_size
+        new_block[:, 0] = True
+        starts = rng.integers(0, T, (n_boot, T))
+        # 每個位置所屬區塊的起點位置 (向前填補)
+        t = np.arange(T)
+        block_pos = np.maximum.accumulate(np.where(new_block, t, 0), axis=1)
+        first = np.take_along_axis(starts, block_pos, axis=1)
+        return (first + t - block_pos) % T
+    elif method == 'block':
+        # 區塊不能比序列長
+        block_size = min(block_size, T)
+        n_blocks = -(-T // block_size)
+        starts = rng.integers(0, T - block_size + 1, (n_boot, n_blocks))
+        return (starts[:, :, None] + np.arange(block_size)).reshape(n_boot, -1)[:, :T]
+    raise ValueError(f"Unknown bootstrap method: {method}")
+
+def bootstrap_ci(returns, n_boot=5000, method='stationary', block_size=None, alpha=0.05,
+                 benchmark=None, periods=252, chunk_size=500, seed=0):
+    """
+    Sharpe 與波動率的 bootstrap 信賴區間
+    所有策略使用同一組重抽樣索引 (保留策略間的相關性)；
+    重抽樣以 chunk_size 為單位分批組成 (chunk, T, S) 陣列一次計算，限制記憶體用量。
+    benchmark: 指定策略名稱時，另外計算各策略與其 Sharpe 差的信賴區間與單尾 p 值 (差 <= 0 的比例)
+    """
+    R, names = _values(returns)
+    T, S = R.shape
+    rng = np.random.default_rng(seed)
+    sharpe = np.empty((n_boot, S))
+    vol = np.empty((n_boot, S))
+    for lo in range(0, n_boot, chunk_size):
+        n = min(chunk_size, n_boot - lo)
+        sample = R[bootstrap_indices(T, n, method, block_size, rng)] # (n, T, S)
+        mu = sample.mean(axis=1) * periods
+        sd = sample.std(axis=1, ddof=1) * np.sqrt(periods)
+        sharpe[lo : lo+n] = _safe_div(mu, sd)
+        vol[lo : lo+n] = sd
+    q = [alpha / 2, 1 - alpha / 2]
+    point = performance_metrics(returns, periods=periods)
+    sharpe_q = np.quantile(sharpe, q, axis=0)
+    vol_q = np.quantile(vol, q, axis=0)
+    out = pd.DataFrame({
+        'Sharpe': point['Sharpe'].values,
+        'Sharpe Low': sharpe_q[0], 'Sharpe High': sharpe_q[1],
+        'Volatility': point['Volatility'].values,
+        'Volatility Low': vol_q[0], 'Volatility High': vol_q[1],
+    }, index=pd.Index(names, name='Strategy'))
+    if benchmark is not None:
+        diff = sharpe - sharpe[:, names.index(benchmark)][:, None]
+        diff_q = np.quantile(diff, q, axis=0)
+        out['Sharpe Diff'] = out['Sharpe'] - out.loc[benchmark, 'Sharpe']
+        out['Sharpe Diff Low'] = diff_q[0]
+        out['Sharpe Diff High'] = diff_q[1]
+        out['p-value'] = (diff <= 0).mean(axis=0)
+        out.loc[benchmark, 'p-value'] = np.nan
+    return out
@@ -0,0 +1,91 @@
+import numpy as np
+
+class SlidingWindowMoments:
+    """
+    滑動視窗動差追蹤器 (Incremental Moments)
+    維護視窗內的一階和與交叉乘積和，新資料進入時累加、舊資料離開時扣除，
+    避免每次調倉都以 O(window * N^2) 從頭計算協方差矩陣。
+    dtype: 累積量的浮點型別 (float32 時記憶體與頻寬減半)
+    """
+    def __init__(self, n_features, shift=None, dtype=np.float64):
+        self.n_features = n_features
+        self.dtype = np.dtype(dtype)
+        # 平移量 (shift)：先扣掉一個接近均值的常數再累加，避免大數相減的精度流失
+        self.shift = None if shift is None else np.asarray(shift, dtype=self.dtype)
+        self.reset()
+
+    def reset(self, shift=None):
+        """清空累積量，可同時指定新的平移量"""
+        if shift is not None:
+            self.shift = np.asarray(shift, dtype=self.dtype)
+        self.count = 0
+        self.sum_ = np.zeros(self.n_features, dtype=self.dtype)
+        self.cross_ = np.zeros((self.n_features, self.n_features), dtype=self.dtype)
+        return self
+
+    def add(self, X):
+        """加入新進視窗的資料列 (k x N)"""
+        X = np.atleast_2d(np.asarray(X, dtype=self.dtype))
+        if self.shift is None:
+            self.shift = X.mean(axis=0)
+        Xc = X - self.shift
+        self.count += Xc.shape[0]
+        self.sum_ += Xc.sum(axis=0)
+        self.cross_ += Xc.T @ Xc
+        return self
+
+    def remove(self, X):
+        """移除離開視窗的資料列 (k x N)"""
+        X = np.atleast_2d(np.asarray(X, dtype=self.dtype))
+        Xc = X - self.shift
+        self.count -= Xc.shape[0]
+        self.sum_ -= Xc.sum(axis=0)
+        self.cross_ -= Xc.T @ Xc
+        return self
+
+    def mean(self):
+        return self.shift + self.sum_ / self.count
+
+    def cov(self, ddof=1):
+        """樣本協方差矩陣 (與 DataFrame.cov() 相同的 ddof=1)"""
+        m = self.sum_ / self.count
+        cov = (self.cross_ - self.count * np.outer(m, m)) / (self.count - ddof)
+        # 累加/扣除的順序不同會造成極小的不對稱，這裡強制對稱
+        return 0.5 * (cov + cov.T)
+
+    def std(self, ddof=1):
+        return np.sqrt(np.diag(self.cov(ddof)))
+
+    def corr(self):
+        """相關係數矩陣 (與 np.corrcoef 相同)"""
+        cov = self.cov()
+        d = np.sqrt(np.diag(cov))
+        corr = cov / np.outer(d, d)
+        np.clip(corr, -1, 1, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+def rolling_moments(values, window, points, refresh_every=None):
+    """
+    依序產生每個調倉點 t 的視窗 [t-window, t) 動差。
+    相鄰調倉點之間只加入新資料、扣除舊資料；
+    每 refresh_every 個調倉點 (以及視窗不重疊時) 從頭重建一次，避免累積誤差。
+    產生 (t, moments)，moments 為同一個物件，呼叫端需在下一次迭代前取用。
+    values 為 float32 時動差也以 float32 累積，其餘型別一律轉為 float64。
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        values = values.astype(np.float64, copy=False)
+    mom = SlidingWindowMoments(values.shape[1], dtype=values.dtype)
+    t_prev = None
+    for i, t in enumerate(points):
+        rebuild = (t_prev is None or t - t_prev >= window
+                   or (refresh_every is not None and i % refresh_every == 0))
+        if rebuild:
+            block = values[t - window : t]
+            mom.reset(shift=block.mean(axis=0)).add(block)
+        else:
+            mom.add(values[t_prev : t])
+            mom.remove(values[t_prev - window : t - window])
+        t_prev = t
+        yield t, mom
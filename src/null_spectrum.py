@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# 雜訊頻譜快取：(T, N, n_surrogates, seed) -> (n_surrogates, N) 特徵值
+# 只快取與數據無關的高斯代理矩陣；同形狀的滾動視窗不必重算
+# 參數掃描會產生許多不同的 (T, N)，只保留最近使用的 _CACHE_SIZE 個 (LRU)
+_CACHE = OrderedDict()
+_CACHE_SIZE = 16
+
+def clear_cache():
+    _CACHE.clear()
+
+def _chunk_size(T, N, budget=2**28):
+    """每批代理矩陣的個數，讓 (chunk, T, N) 數據與 Gram 矩陣約在 budget bytes 內"""
+    g = min(T, N)
+    return max(1, int(budget // (8 * (T * N + g * g))))
+
+def _standardize(Z):
+    # 每個代理矩陣的每一欄標準化，使 Z^T Z 為相關係數矩陣
+    Z = Z - Z.mean(axis=1, keepdims=True)
+    return Z / np.sqrt((Z**2).sum(axis=1, keepdims=True))
+
+def _spectra(Z, N):
+    """
+    一次以批次 eigvalsh 計算 (c, T, N) 代理數據的相關係數特徵值 (遞增)
+    T < N 時改算較小的 T x T Gram 矩陣 Z Z^T，非零特徵值相同，其餘補 0
+    """
+    c, T, _ = Z.shape
+    if T < N:
+        evals = np.linalg.eigvalsh(Z @ Z.transpose(0, 2, 1))
+        return np.concatenate([np.zeros((c, N - T)), evals], axis=1)
+    return np.linalg.eigvalsh(Z.transpose(0, 2, 1) @ Z)
+
+def _null_chunk(args):
+    """
+    產生一批代理矩陣並計算其頻譜
+    每個代理矩陣有自己的亂數種子，結果與分批大小、平行數無關
+    """
+    T, N, seeds, X = args
+    rngs = [np.random.default_rng(s) for s in seeds]
+    if X is None:
+        Z = np.stack([rng.standard_normal((T, N)) for rng in rngs])
+    else:
+        # 各欄獨立打亂時間順序：保留每檔股票的邊際分佈 (厚尾)，破壞股票間的相關性
+        Z = np.stack([rng.permuted(X, axis=0) for rng in rngs])
+    return _spectra(_standardize(Z), N)
+
+def null_spectrum(T, N, n_surrogates=200, surrogate='gaussian', X=None, seed=0, chunk_size=None, n_jobs=1):
+    """
+    Monte-Carlo 雜訊頻譜：n_surrogates 個「無相關」代理矩陣的相關係數特徵值 (n_surrogates, N)
+    surrogate:
+      'gaussian': i.i.d. 常態隨機矩陣 (只與 T, N 有關，結果依 (T, N, n_surrogates, seed) 快取)
+      'shuffle' : 將數據 X (T x N) 的每一欄各自打亂 (保留厚尾，不快取)
+    代理矩陣以 chunk_size 個為一批堆疊成張量，一次批次 eigvalsh；
+    n_jobs > 1 時各批交給行程池計算。
+    """
+    T = int(round(T))
+    if surrogate == 'gaussian':
+        key = (T, N, n_surrogates, seed)
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+        X = None
+    elif surrogate == 'shuffle':
+        if X is None:
+            raise ValueError("surrogate='shuffle' requires the data X")
+        X = np.asarray(X, dtype=float)
+        T, N = X.shape
+    else:
+        raise ValueError(f"Unknown surrogate: {surrogate}")
+    chunk_size = chunk_size or _chunk_size(T, N)
+    seeds = np.random.SeedSequence(seed).spawn(n_surrogates)
+    tasks = [(T, N, seeds[lo : lo+chunk_size], X) for lo in range(0, n_surrogates, chunk_size)]
+    if n_jobs != 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as pool:
+            parts = list(pool.map(_null_chunk, tasks))
+    else:
+        parts = [_null_chunk(task) for task in tasks]
+    spectra = np.concatenate(parts)
+    if surrogate == 'gaussian':
+        _CACHE[key] = spectra
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return spectra
+
+def mp_pdf(x, sigma2, q):
+    """Marchenko-Pastur 密度 (q = T / N)，界限外為 0"""
+    lambda_min = sigma2 * (1 - np.sqrt(1.0 / q))**2
+    lambda_max = sigma2 * (1 + np.sqrt(1.0 / q))**2
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pdf = q / (2 * np.pi * sigma2 * x) * np.sqrt((lambda_max - x) * (x - lambda_min))
+    return np.nan_to_num(np.where((x > lambda_min) & (x < lambda_max), pdf, 0.0))
+
+def fit_sigma2(eigenvalues, q, bandwidth=0.01, n_points=1000):
+    """
+    以 MP 密度擬合雜訊變異數 sigma2：
+    最小化經驗特徵值的核密度估計 (Gaussian KDE) 與 MP 密度在 [lambda_min, lambda_max] 上的平方誤差
+    (訊號特徵值會佔去部分變異，因此雜訊的 sigma2 通常小於 1)
+    """
+    from scipy.optimize import minimize_scalar # 載入很慢，只在需要時 import
+    evals = np.asarray(eigenvalues, dtype=float)
+
+    def sse(sigma2):
+        x = np.linspace(sigma2 * (1 - np.sqrt(1.0 / q))**2, sigma2 * (1 + np.sqrt(1.0 / q))**2, n_points)
+        kde = np.exp(-0.5 * ((x[:, None] - evals) / bandwidth)**2).sum(axis=1)
+        kde /= len(evals) * bandwidth * np.sqrt(2 * np.pi)
+        return ((kde - mp_pdf(x, sigma2, q))**2).sum()
+
+    return minimize_scalar(sse, bounds=(1e-5, 1.0), method='bounded', options={'xatol': 1e-6}).x
@@ -1,52 +1,260 @@
 import numpy as np
 import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
 from src.clustering import HierarchicalClustering
+from src.denoise import FactorCovariance
+from src.min_variance import solve_active_set, solve_turnover
 
 class MeanVarianceOptimizer:
     """
     傳統均值-變異數優化 (Markowitz)
+    long_only: 不允許放空 (w >= 0)
+    max_weight: 單一資產權重上限 (None 代表不設限)
+    max_turnover: 相對上一次調倉權重的換手率上限 sum|w - w_prev| (None 代表不設限；
+                  沒有上一次的權重時 (第一次建倉) 不適用)
+    有任一限制時以內建的 active-set 法求解 (換手率限制再以 ADMM 求解)，
+    並從上一次調倉的權重 (與其觸界資產構成的工作集合) 暖啟動，通常幾次迭代就收斂。
+    設定 max_turnover 後權重依賴前一次的結果 (path_dependent)，回測會依序計算。
     """
-    def __init__(self, long_only=False):
+    def __init__(self, long_only=False, max_weight=None, max_turnover=None, tol=1e-10):
         self.long_only = long_only # 預設 False 以展示原始矩陣的不穩定性
+        self.max_weight = max_weight
+        self.max_turnover = max_turnover
+        self.tol = tol
 
-    def get_gmvp_weights(self, cov_matrix):
+    @property
+    def constrained(self):
+        return self.long_only or self.max_weight is not None or self.max_turnover is not None
+
+    @property
+    def path_dependent(self):
+        return self.max_turnover is not None
+
+    def get_bounds(self, N):
+        """權重的上下界 (lower, upper)"""
+        lower = 0.0 if self.long_only else -np.inf
+        upper = np.inf if self.max_weight is None else float(self.max_weight)
+        if N * upper < 1.0:
+            raise ValueError(f"max_weight={self.max_weight} is infeasible for {N} assets")
+        return lower, upper
+
+    def get_gmvp_weights(self, cov_matrix, w_prev=None):
         """
         計算全域最小變異數組合 (GMVP)
         w = (Sigma^-1 * 1) / (1^T * Sigma^-1 * 1)
+        w_prev: 上一次調倉的權重 (暖啟動與換手率限制)
         """
         # 如果是 DataFrame，轉 numpy，但要記錄 index
         if isinstance(cov_matrix, pd.DataFrame):
             assets = cov_matrix.index
-            cov = cov_matrix.values
+            cov = cov_matrix.values[np.newaxis]
+        elif isinstance(cov_matrix, FactorCovariance):
+            # 因子結構直接以 Woodbury 求解
+            assets = cov_matrix.index
+            cov = [cov_matrix]
         else:
             assets = range(cov_matrix.shape[0])
-            cov = cov_matrix
+            cov = cov_matrix[np.newaxis]
+        w_prev = None if w_prev is None else np.asarray(w_prev, dtype=float)
+        w, _ = self.get_gmvp_weights_batch(cov, diagnostics=False, w_prev=w_prev)
+        return pd.Series(w[0], index=assets)
+
+    def get_gmvp_weights_batch(self, covs, diagnostics=False, w_prev=None):
+        """
+        批次計算 K 個協方差矩陣的 GMVP 權重。
+        covs: (K, N, N) 協方差張量，或 K 個 FactorCovariance 的列表 (以 Woodbury 逐一求解)
+        不建立顯式反矩陣，而是以 Cholesky 分解求解 Sigma x = 1；
+        某個切片分解失敗時只對該切片退回 LU 求解 / 最小平方解。
+        有限制條件時依序處理各切片，每個切片從前一個切片 (第一個切片為 w_prev) 的權重暖啟動。
+        diagnostics: True 時以批次 eigvalsh 計算條件數 (O(K N^3)，約與求解本身一樣久)，否則 cond 為 NaN
+        回傳 (weights: (K, N) 陣列, 診斷資訊 DataFrame: 條件數、求解方法與限制條件的迭代次數)
+        """
+        if len(covs) and isinstance(covs[0], FactorCovariance):
+            return self._get_factor_weights_batch(covs, w_prev)
+        # float32 的協方差維持 float32 求解 (記憶體與頻寬減半)，其餘型別轉為 float64
+        covs = np.asarray(covs)
+        dtype = np.float32 if covs.dtype == np.float32 else np.float64
+        covs = covs.astype(dtype, copy=False)
+        K, N, _ = covs.shape
+        ones = np.ones((K, N, 1), dtype=dtype)
+        methods = np.full(K, 'cholesky', dtype=object)
+        try:
+            # 全部切片皆為正定時，一次完成批次分解與求解
+            L = np.linalg.cholesky(covs)
+            x = cho_solve((L, True), ones)[..., 0]
+        except np.linalg.LinAlgError:
+            x = np.empty((K, N), dtype=dtype)
+            for k in range(K):
+                x[k], methods[k] = self._solve_single(covs[k])
+        # w = x / (1^T x)
+        denom = x.sum(axis=1)
+        bad = ~np.isfinite(denom) | (np.abs(denom) < 1e-300)
+        weights = x / np.where(bad, 1.0, denom)[:, np.newaxis]
+        if bad.any():
+            # 解不出有意義的權重時 (極少發生)，該切片回傳等權重
+            weights[bad] = 1.0 / N
+            methods[bad] = 'equal'
+        iterations = self._apply_constraints(covs, weights, methods, w_prev)
+        info = pd.DataFrame({'method': methods})
+        if iterations is not None:
+            info['iterations'] = iterations
+        if diagnostics:
+            # 條件數 = 最大特徵值 / 最小特徵值 (對稱矩陣)，一次批次計算
+            evals = np.abs(np.linalg.eigvalsh(covs))
+            with np.errstate(divide='ignore'):
+                info['cond'] = evals.max(axis=1) / evals.min(axis=1)
+        else:
+            info['cond'] = np.nan
+        return weights, info
+
+    def _get_factor_weights_batch(self, covs, w_prev=None):
+        """FactorCovariance 列表：每個切片以 Woodbury 求解，O(N k^2)"""
+        N = covs[0].shape[0]
+        ones = np.ones(N)
+        weights = np.empty((len(covs), N))
+        for k, cov in enumerate(covs):
+            x = cov.solve(ones)
+            weights[k] = x / x.sum()
+        methods = np.full(len(covs), 'woodbury', dtype=object)
+        iterations = self._apply_constraints(covs, weights, methods, w_prev)
+        # 因子結構不做 O(N^3) 的特徵值分解，條件數不計算
+        info = pd.DataFrame({'method': methods, 'cond': np.nan})
+        if iterations is not None:
+            info['iterations'] = iterations
+        return weights, info
+
+    def _apply_constraints(self, covs, weights, methods, w_prev=None):
+        """
+        有限制條件時，依序把違反限制的切片改解有限制的問題 (無限制解可行時即為最優解)
+        回傳每個切片的迭代次數 (沒有限制條件時回傳 None)
+        """
+        if not self.constrained:
+            return None
+        K, N = weights.shape
+        lower, upper = self.get_bounds(N)
+        iterations = np.zeros(K, dtype=int)
+        for k in range(K):
+            w = weights[k].astype(float)
+            turnover_ok = w_prev is None or self.max_turnover is None \
+                or np.abs(w - w_prev).sum() <= self.max_turnover
+            if turnover_ok and np.all((w >= lower) & (w <= upper)):
+                w_prev = w
+                continue
+            cov = covs[k] if isinstance(covs[k], FactorCovariance) else np.asarray(covs[k], dtype=float)
+            # 暖啟動：上一次的權重 (第一次則以無限制解投影) 的觸界資產即為初始工作集合
+            w, iterations[k] = solve_active_set(cov, lower, upper, w if w_prev is None else w_prev, self.tol)
+            methods[k] += '+active_set'
+            if w_prev is not None and self.max_turnover is not None:
+                turnover = np.abs(w - w_prev).sum()
+                if turnover > self.max_turnover:
+                    # 從 w_prev 往 active-set 解移動到換手率上限的可行點出發
+                    w0 = w_prev + self.max_turnover / turnover * (w - w_prev)
+                    w, n = solve_turnover(cov, lower, upper, w_prev, self.max_turnover, w0)
+                    iterations[k] += n
+                    methods[k] += '+turnover'
+            weights[k] = w
+            w_prev = w
+        return iterations
+
+    @staticmethod
+    def _solve_single(cov):
+        """單一切片求解 Sigma x = 1：Cholesky -> LU -> 最小平方 (偽逆)"""
+        ones = np.ones(len(cov))
+        try:
+            return cho_solve(cho_factor(cov, lower=True), ones), 'cholesky'
+        except np.linalg.LinAlgError:
+            pass
         try:
-            inv_cov = np.linalg.inv(cov)
-            ones = np.ones(len(cov))
-            w = np.dot(inv_cov, ones) / np.dot(np.dot(ones.T, inv_cov), ones)
-            return pd.Series(w, index=assets)
+            return np.linalg.solve(cov, ones), 'lu'
         except np.linalg.LinAlgError:
-            # 如果矩陣真的不可逆 (極少發生)，回傳等權重
-            return pd.Series(np.ones(len(cov))/len(cov), index=assets)
+            return np.linalg.lstsq(cov, ones, rcond=None)[0], 'lstsq'
 
 class HRPOptimizer:
     """
     階層風險平價優化 (HRP)
+    drift_threshold: 若距離矩陣相對「上次重新分群時」的漂移量低於此門檻，
+                     沿用上次的樹狀圖與排序，只重跑權重分配 (None 代表每次都重新分群)
+    drift_metric: 漂移量的定義，'max' (最大絕對變化) 或 'mean' (平均絕對變化)
+    cache_hits / cache_misses 記錄沿用與重算的次數，用來權衡延遲與權重精確度。
+    設定 drift_threshold 後結果依賴調倉的走訪順序 (path_dependent)，回測會在主行程依序計算。
     """
-    def get_weights(self, returns):
-        # 1. 準備數據
-        corr = returns.corr()
-        cov = returns.cov()
-        # 2. 分群與排序
+    def __init__(self, drift_threshold=None, drift_metric='max'):
+        self.drift_threshold = drift_threshold
+        self.drift_metric = drift_metric
+        self.reset_cache()
+
+    @property
+    def path_dependent(self):
+        return self.drift_threshold is not None
+
+    def reset_cache(self):
+        """清除沿用的樹狀圖並歸零計數器"""
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.last_drift_ = None
+        self.link_ = None
+        self.sort_ix_ = None
+        self._ref_dist = None
+        self._ref_assets = None
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'last_drift': self.last_drift_}
+
+    def _drift(self, dist):
+        diff = np.abs(dist - self._ref_dist)
+        if self.drift_metric == 'max':
+            return diff.max()
+        elif self.drift_metric == 'mean':
+            return diff.mean()
+        raise ValueError(f"Unknown drift_metric: {self.drift_metric}")
+
+    def _get_sort_ix(self, corr, link=None):
+        """取得 quasi-diag 排序：漂移量低於門檻時沿用上次的結果 (link: 已算好的連結矩陣)"""
         hc = HierarchicalClustering()
-        link = hc.get_linkage(corr.values)
-        sort_ix_list = hc.get_quasi_diag(link)
-        # 轉換回 index 名稱
-        sort_ix = corr.index[sort_ix_list].tolist()
+        if link is not None and self.drift_threshold is None:
+            self.cache_misses += 1
+            self.link_ = link
+            self.sort_ix_ = np.asarray(hc.get_quasi_diag(link))
+            return self.sort_ix_
+        dist = hc.get_distance(corr.values)
+        if self.drift_threshold is not None and self._ref_dist is not None \
+                and corr.index.equals(self._ref_assets):
+            self.last_drift_ = self._drift(dist)
+            if self.last_drift_ < self.drift_threshold:
+                self.cache_hits += 1
+                return self.sort_ix_
+        self.cache_misses += 1
+        self.link_ = hc.get_linkage(dist=dist) if link is None else link
+        self.sort_ix_ = np.asarray(hc.get_quasi_diag(self.link_))
+        if self.drift_threshold is not None:
+            # 漂移量以最近一次重新分群的距離矩陣為基準，緩慢累積的變化也會被偵測到
+            self._ref_dist = dist
+            self._ref_assets = corr.index
+        return self.sort_ix_
+
+    def get_weights(self, returns=None, corr=None, cov=None, link=None):
+        """
+        returns: 訓練期報酬 (DataFrame)
+        corr, cov: 已算好的相關係數/協方差 (DataFrame)，傳入時不再從 returns 重算；
+                   cov 也可以是 FactorCovariance
+        link: 已算好的 corr 連結矩陣 (例如回測的磁碟快取)
+        """
+        # 1. 準備數據
+        if corr is None:
+            corr = returns.corr()
+        if cov is None:
+            cov = returns.cov()
+        # 2. 分群與排序 (整數索引)
+        sort_ix = self._get_sort_ix(corr, link)
         # 3. 遞迴分配權重
-        # 注意：重排 covariance matrix
-        cov_sorted = cov.loc[sort_ix, sort_ix]
-        weights = hc.get_rec_bisection(cov_sorted, sort_ix)
+        # 注意：重排 covariance matrix (FactorCovariance 保持因子結構)
+        if isinstance(cov, FactorCovariance):
+            cov_sorted = cov.take(sort_ix)
+        else:
+            cov_values = cov.values if isinstance(cov, pd.DataFrame) else np.asarray(cov)
+            cov_sorted = cov_values[np.ix_(sort_ix, sort_ix)]
+        w_sorted = HierarchicalClustering.get_rec_bisection_array(cov_sorted)
         # 轉回原始順序
-        return weights.loc[returns.columns]
\ No newline at end of file
+        weights = np.empty(len(sort_ix))
+        weights[sort_ix] = w_sorted
+        return pd.Series(weights, index=corr.index)
@@ -0,0 +1,34 @@
+"""
+行程池的共享記憶體工具：報酬矩陣只放進共享記憶體一次，
+每個 worker 以 initializer 映射同一塊記憶體，任務只傳遞少量參數
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+def n_workers(n_jobs):
+    """-1 代表使用全部核心"""
+    return os.cpu_count() if n_jobs == -1 else n_jobs
+
+def map_shared(fn, tasks, values, n_jobs, initializer, initargs=()):
+    """
+    把 values 複製到共享記憶體後以行程池執行 fn(task)
+    每個 worker 以 initializer(shm_name, shape, dtype, *initargs) 初始化一次 (見 attach_shared)，
+    結果依 tasks 的順序回傳
+    """
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        initargs = (shm.name, values.shape, values.dtype.str) + tuple(initargs)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as pool:
+            # map 依提交順序回傳，結果以確定的順序拼接
+            return list(pool.map(fn, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+def attach_shared(shm_name, shape, dtype):
+    """worker 端映射共享記憶體，回傳 (shm, ndarray)；shm 需保留參照直到 worker 結束"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
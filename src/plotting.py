@@ -0,0 +1,63 @@
+"""
+繪圖工具 (matplotlib / seaborn 只在 import 這個模組時才載入)
+path: 存檔路徑 (None 代表不存檔)；show: 是否呼叫 plt.show() (無螢幕的伺服器請設為 False)
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# 設定繪圖風格
+sns.set_style('whitegrid')
+
+def _finish(fig, path, show, dpi):
+    if path is not None:
+        fig.savefig(path, dpi=dpi)
+        print(f"[Saved] {path}")
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+def plot_spectrum(rmt, path=None, show=True, dpi=150):
+    """繪製特徵值分佈 vs MP 理論曲線 (rmt: 已 fit 的 RMTDenoising)"""
+    if rmt.eigenvalues_ is None:
+        raise ValueError("Run .fit() first!")
+    # 產生理論 PDF
+    x = np.linspace(rmt.lambda_min, rmt.lambda_max, 1000)
+    pdf = (rmt.q / (2 * np.pi * rmt.sigma2 * x)) * np.sqrt((rmt.lambda_max - x) * (x - rmt.lambda_min))
+    pdf = np.nan_to_num(pdf)
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(x, pdf, color='orange', linewidth=3, label='Theoretical MP Law (Noise)')
+    # 為了視覺美觀，過濾掉超級大的 Market Mode 特徵值
+    evals_display = rmt.eigenvalues_[rmt.eigenvalues_ <= rmt.lambda_max * rmt.alpha]
+    plt.hist(evals_display, bins=50, density=True, alpha=0.6, color='steelblue', label='Empirical Eigenvalues')
+    plt.axvline(rmt.lambda_max, color='red', linestyle='--', label=f'Noise Upper Bound ({rmt.lambda_max:.2f})')
+    plt.title(f'Eigenvalue Spectrum (Q={rmt.q:.2f})')
+    plt.xlabel('Eigenvalue')
+    plt.ylabel('Probability Density')
+    plt.legend()
+    _finish(fig, path, show, dpi)
+
+def plot_cumulative_returns(results, path=None, show=True, dpi=150):
+    """樣本外累積報酬"""
+    ax = (1 + results).cumprod().plot(figsize=(12, 6), linewidth=2)
+    ax.set_title("Out-of-Sample Cumulative Returns")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Growth of $1")
+    ax.grid(True, alpha=0.3)
+    _finish(ax.figure, path, show, dpi)
+
+def plot_weights_comparison(weights, path=None, show=True, dpi=150):
+    """
+    並排比較多個策略的權重 (長條圖)
+    weights: {標題: 權重 Series}
+    """
+    colors = ['salmon', 'steelblue', 'seagreen', 'orchid']
+    fig, axes = plt.subplots(1, len(weights), figsize=(7.5 * len(weights), 6), sharey=True, squeeze=False)
+    for k, (ax, (title, w)) in enumerate(zip(axes[0], weights.items())):
+        w.plot(kind='bar', ax=ax, color=colors[k % len(colors)], width=1.0)
+        ax.set_title(title)
+        ax.set_xlabel("Assets")
+        ax.set_xticks([]) # 隱藏 x 軸標籤
+    plt.tight_layout()
+    _finish(fig, path, show, dpi)
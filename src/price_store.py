@@ -0,0 +1,200 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+class PriceStore:
+    """
+    欄式 (columnar)、可記憶體映射 (memory-mapped) 的價格資料庫
+    目錄結構：
+      root/meta.json          : dtype、股票列表、每檔股票已抓取過的日期區間 (coverage)、
+                                來源沒有回傳數據的區間與最後嘗試時間 (empty)
+      root/dates.i8           : 交易日索引 (int64, 自 1970-01-01 起的天數)
+      root/prices/<ticker>.bin: 與 dates 對齊的價格陣列 (缺值為 NaN)
+    讀取時只映射需要的股票與日期區段；新增交易日只在檔案尾端 append，不改寫歷史資料。
+    """
+    def __init__(self, root, dtype='float64'):
+        self.root = root
+        os.makedirs(os.path.join(root, 'prices'), exist_ok=True)
+        self._meta_path = os.path.join(root, 'meta.json')
+        self._dates_path = os.path.join(root, 'dates.i8')
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {'dtype': np.dtype(dtype).name, 'tickers': [], 'coverage': {}}
+        self.meta.setdefault('empty', {})
+        self.dtype = np.dtype(self.meta['dtype'])
+
+    @property
+    def tickers(self):
+        return list(self.meta['tickers'])
+
+    @property
+    def dates(self):
+        """交易日索引 (DatetimeIndex)"""
+        return pd.DatetimeIndex(self._read_days().astype('datetime64[D]')).as_unit('ns')
+
+    def _read_days(self):
+        if not os.path.exists(self._dates_path) or os.path.getsize(self._dates_path) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.memmap(self._dates_path, dtype=np.int64, mode='r')
+
+    def _price_path(self, ticker):
+        # 檔名不能含路徑分隔符號
+        return os.path.join(self.root, 'prices', ticker.replace(os.sep, '_') + '.bin')
+
+    def _price_map(self, ticker, mode='r'):
+        n_days = len(self._read_days())
+        if n_days == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self._price_path(ticker), dtype=self.dtype, mode=mode, shape=(n_days,))
+
+    @staticmethod
+    def _to_days(dates):
+        return pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64)
+
+    def _save_meta(self):
+        tmp = self._meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self._meta_path)
+
+    # ---- 覆蓋範圍 (coverage) ----
+    def coverage(self, ticker):
+        """已抓取過的日期區間列表 [(start, end), ...]，end 不含 (與 yfinance 相同)"""
+        return [tuple(pd.Timestamp(d) for d in span) for span in self.meta['coverage'].get(ticker, [])]
+
+    def covers(self, ticker, start, end):
+        """[start, end) 是否已完整抓取過"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return any(s <= start and end <= e for s, e in self.coverage(ticker))
+
+    def missing_ranges(self, ticker, start, end):
+        """[start, end) 中尚未抓取過的子區間列表"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        gaps = []
+        cursor = start
+        for s, e in self.coverage(ticker):
+            if e <= cursor or s >= end:
+                continue
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _add_coverage(self, ticker, start, end):
+        # 合併重疊或相鄰的區間
+        spans = sorted(self.coverage(ticker) + [(pd.Timestamp(start), pd.Timestamp(end))])
+        merged = [list(spans[0])]
+        for s, e in spans[1:]:
+            if s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.meta['coverage'][ticker] = [[s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')] for s, e in merged]
+
+    # ---- 來源沒有回傳數據的區間 (不算已抓取，過一段時間後重試) ----
+    def mark_empty(self, ticker, start, end, when=None):
+        """記錄 [start, end) 這次請求沒有拿到任何數據 (暫時失敗、被限流或真的沒有報價)"""
+        when = pd.Timestamp.now() if when is None else pd.Timestamp(when)
+        span = [pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')]
+        entries = [e for e in self.meta['empty'].get(ticker, []) if e[:2] != span]
+        self.meta['empty'][ticker] = entries + [span + [when.isoformat()]]
+
+    def recently_empty(self, ticker, start, end, ttl):
+        """[start, end) 是否在 ttl (Timedelta) 內被記錄為沒有數據"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        cutoff = pd.Timestamp.now() - pd.Timedelta(ttl)
+        return any(pd.Timestamp(s) <= start and end <= pd.Timestamp(e) and pd.Timestamp(when) > cutoff
+                   for s, e, when in self.meta['empty'].get(ticker, []))
+
+    # ---- 讀取 ----
+    def load(self, tickers=None, start=None, end=None):
+        """
+        讀取部分股票與日期區間 [start, end)，只映射需要的區段而不讀整個檔案。
+        不在資料庫中的股票不會出現在結果中。
+        """
+        days = self._read_days()
+        tickers = self.tickers if tickers is None else [t for t in tickers if t in self.meta['tickers']]
+        lo = 0 if start is None else np.searchsorted(days, self._to_days([start])[0], side='left')
+        hi = len(days) if end is None else np.searchsorted(days, self._to_days([end])[0], side='left')
+        index = pd.DatetimeIndex(np.asarray(days[lo:hi]).astype('datetime64[D]')).as_unit('ns')
+        data = np.empty((hi - lo, len(tickers)), dtype=self.dtype)
+        for j, ticker in enumerate(tickers):
+            data[:, j] = self._price_map(ticker)[lo:hi]
+        return pd.DataFrame(data, index=index, columns=tickers)
+
+    # ---- 寫入 ----
+    def write(self, df, start=None, end=None, tickers=None):
+        """
+        合併新數據 (index: 日期, columns: 股票)。
+        新日期都在最後一天之後時，只在每個檔案尾端 append；
+        否則 (補前面的歷史或中間的缺日) 才重寫整個資料庫。
+        start/end: 這次抓取的請求區間，記錄為有回傳數據的股票的 coverage
+        tickers: 這次請求的股票 (預設為 df 的欄位)；區間內有交易日但來源沒有回傳 (或全為缺值) 的股票
+                 不記為已抓取，改記錄在 empty (見 mark_empty)，由呼叫端決定何時重試
+        回傳沒有拿到數據的股票列表
+        """
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        new_days = self._to_days(df.index)
+        days = np.asarray(self._read_days())
+        if len(df.index) == 0:
+            pass # 區間內沒有交易日 (例如假日)，不需寫入價格
+        elif len(days) and (np.isin(new_days, days) | (new_days > days[-1])).all():
+            self._append(df, new_days, days)
+        else:
+            self._rewrite(df)
+        empty = []
+        if start is not None and end is not None:
+            returned = set(df.columns[df.notna().any().values])
+            # 來源成功回傳但區間內沒有任何交易日：所有請求的股票都記為已抓取 (不必重試)
+            no_rows = len(df.index) == 0
+            for ticker in (df.columns if tickers is None else tickers):
+                if no_rows or ticker in returned:
+                    self._add_coverage(ticker, start, end)
+                    self.meta['empty'].pop(ticker, None)
+                else:
+                    self.mark_empty(ticker, start, end)
+                    empty.append(ticker)
+        self._save_meta()
+        return empty
+
+    def _append(self, df, new_days, days):
+        n_old = len(days)
+        tail = new_days[new_days > days[-1]] if n_old else new_days
+        # 1. 新交易日：每個既有檔案尾端補上 NaN，之後再填值
+        if len(tail):
+            with open(self._dates_path, 'ab') as f:
+                f.write(tail.astype(np.int64).tobytes())
+            pad = np.full(len(tail), np.nan, dtype=self.dtype).tobytes()
+            for ticker in self.meta['tickers']:
+                with open(self._price_path(ticker), 'ab') as f:
+                    f.write(pad)
+        # 2. 新股票：建立與日期索引等長的 NaN 檔案
+        n_days = n_old + len(tail)
+        for ticker in df.columns:
+            if ticker not in self.meta['tickers']:
+                np.full(n_days, np.nan, dtype=self.dtype).tofile(self._price_path(ticker))
+                self.meta['tickers'].append(ticker)
+        # 3. 就地寫入 (memmap r+)，只有非缺值才覆蓋
+        all_days = self._read_days()
+        pos = np.searchsorted(all_days, new_days)
+        for ticker in df.columns:
+            values = df[ticker].values.astype(self.dtype)
+            valid = ~np.isnan(values)
+            if valid.any():
+                mm = self._price_map(ticker, mode='r+')
+                mm[pos[valid]] = values[valid]
+                mm.flush()
+
+    def _rewrite(self, df):
+        old = self.load()
+        merged = df.combine_first(old) if len(old.columns) else df
+        merged = merged.astype(self.dtype)
+        self._to_days(merged.index).astype(np.int64).tofile(self._dates_path)
+        for ticker in merged.columns:
+            merged[ticker].values.tofile(self._price_path(ticker))
+        self.meta['tickers'] = list(merged.columns)
@@ -0,0 +1,37 @@
+import pandas as pd
+
+class PriceProvider:
+    """
+    價格資料來源介面
+    fetch(tickers, start, end) 回傳 [start, end) 的收盤價 DataFrame (index: 日期, columns: 股票)
+    """
+    def fetch(self, tickers, start, end):
+        raise NotImplementedError
+
+class YFinanceProvider(PriceProvider):
+    """Yahoo Finance (yfinance 只在實際下載時才載入)"""
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+        df = yf.download(list(tickers), start=start, end=end, progress=False)['Close']
+        if isinstance(df, pd.Series):
+            df = df.to_frame(tickers[0])
+        return df
+
+class FileProvider(PriceProvider):
+    """
+    本地檔案 / DataFrame 價格來源 (離線測試用)
+    source: 收盤價 DataFrame 或 CSV 路徑 (第一欄為日期)
+    """
+    def __init__(self, source):
+        if isinstance(source, pd.DataFrame):
+            self.prices = source
+        else:
+            self.prices = pd.read_csv(source, index_col=0, parse_dates=True)
+        self.calls = [] # 記錄每次請求 (tickers, start, end)，方便測試確認只抓缺口
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((list(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        idx = self.prices.index
+        rows = (idx >= pd.Timestamp(start)) & (idx < pd.Timestamp(end))
+        cols = [t for t in tickers if t in self.prices.columns]
+        return self.prices.loc[rows, cols]
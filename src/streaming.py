@@ -0,0 +1,193 @@
+import time
+import numpy as np
+import pandas as pd
+from src.backtest import Strategy, WindowEstimates, _reset_state
+from src.moments import SlidingWindowMoments
+from src.optimization import HRPOptimizer
+
+class EWMAMoments:
+    """
+    指數加權 (EWMA) 動差，每根 K 棒 O(N^2) 更新
+    mean_t = mean_{t-1} + a (x - mean_{t-1})
+    cov_t  = (1 - a) (cov_{t-1} + a (x - mean_{t-1})(x - mean_{t-1})^T)
+    """
+    def __init__(self, n_features, halflife=63):
+        self.n_features = n_features
+        self.halflife = halflife
+        self.a = 1 - np.exp(np.log(0.5) / halflife)
+        self.count = 0
+        self.mean_ = np.zeros(n_features)
+        self.cov_ = np.zeros((n_features, n_features))
+
+    def add(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.count == 0:
+            self.mean_ = x.copy()
+        else:
+            d = x - self.mean_
+            self.mean_ += self.a * d
+            self.cov_ = (1 - self.a) * (self.cov_ + self.a * np.outer(d, d))
+        self.count += 1
+        return self
+
+    @property
+    def effective_size(self):
+        """有效樣本數 (供 RMT 的 q = T / N 使用)"""
+        return min(self.count, (2 - self.a) / self.a)
+
+    def mean(self):
+        return self.mean_
+
+    def cov(self):
+        return self.cov_
+
+    def std(self):
+        return np.sqrt(np.diag(self.cov_))
+
+    def corr(self):
+        d = self.std()
+        corr = self.cov_ / np.outer(d, d)
+        np.clip(corr, -1, 1, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+class StreamingRebalancer:
+    """
+    串流式調倉器：一次輸入一根 K 棒的報酬向量。
+    mode='window': 滑動視窗動差 (加入新列、扣除最舊一列，每根 O(N^2))
+    mode='ewma'  : 指數加權 (halflife 根 K 棒)；調倉時所有策略 (Raw / RMT / LW / HRP) 都由
+                   加權後的緩衝區估計 (見 _ewma_values，權重截斷到最近 window 根)，
+                   RMT 的 q = T / N 以加權後的有效樣本數計算
+    每累積 rebalance_freq 根 K 棒 (且已滿 window 根) 就以 RMT/LW/HRP/GMVP 重新計算權重；
+    以 replay() 重播歷史時，結果與 RollingBacktest 的批次回測相同 (mode='window')。
+    latency_budget: 單次調倉的延遲預算 (秒)，超過時累計於 budget_exceeded
+    """
+    def __init__(self, assets, strategies, window=252, rebalance_freq=21, mode='window',
+                 halflife=63, refresh_every=None, latency_budget=None):
+        self.assets = pd.Index(assets)
+        self.strategies = [Strategy(*s) for s in strategies]
+        # 重複使用的策略物件不沿用先前的樹狀圖或追蹤子空間
+        _reset_state(self.strategies)
+        self.window = window
+        self.rebalance_freq = rebalance_freq
+        self.mode = mode
+        # 滑動視窗動差每隔幾根 K 棒由緩衝區重建一次，避免累積誤差
+        self.refresh_every = window if refresh_every is None else refresh_every
+        self.latency_budget = latency_budget
+        N = len(self.assets)
+        if mode == 'window':
+            self.moments = SlidingWindowMoments(N)
+        elif mode == 'ewma':
+            self.moments = EWMAMoments(N, halflife)
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+        # 最近 window 根 K 棒的環狀緩衝區 (LW 與低秩 RMT 需要原始數據)
+        self._buffer = np.empty((window, N))
+        self.n_bars = 0
+        self.weights = {}
+        self.latency_ = None
+        self.n_rebalances = 0
+        self.budget_exceeded = 0
+
+    def _train_values(self):
+        """依時間順序排列的訓練視窗"""
+        n = min(self.n_bars, self.window)
+        head = self.n_bars % self.window
+        if self.n_bars < self.window:
+            return self._buffer[:n]
+        return np.concatenate([self._buffer[head:], self._buffer[:head]])
+
+    def _ewma_values(self):
+        """
+        EWMA 模式的訓練數據：緩衝區各列減去 EWMA 平均再乘上 sqrt(權重 x 列數)，
+        使 Y^T Y / n 為截斷到最近 window 根的 EWMA 協方差 (權重 (1 - a)^age，正規化為總和 1)。
+        回傳 (Y, 有效樣本數 1 / sum(w^2))
+        """
+        X = self._train_values()
+        n = len(X)
+        w = (1 - self.moments.a) ** np.arange(n - 1, -1, -1)
+        w /= w.sum()
+        return (X - self.moments.mean()) * np.sqrt(w * n)[:, np.newaxis], 1 / np.sum(w**2)
+
+    def update(self, returns):
+        """
+        輸入一根 K 棒的報酬 (長度 N 的陣列，或以資產為 index 的 Series)。
+        回傳 (這根 K 棒以目前持有權重計算的組合報酬 {策略: 報酬}, 若觸發調倉則為新權重 {策略: Series} 否則 None)
+        """
+        if isinstance(returns, pd.Series):
+            returns = returns.reindex(self.assets).values
+        x = np.asarray(returns, dtype=float)
+        # 1. 以調倉前持有的權重計算這根 K 棒的組合報酬 (Buy and Hold)
+        realized = {name: float(w.values @ x) for name, w in self.weights.items()}
+        # 2. 寫入環狀緩衝區並更新動差狀態
+        slot = self.n_bars % self.window
+        oldest = self._buffer[slot].copy()
+        self._buffer[slot] = x
+        self.n_bars += 1
+        if self.mode == 'ewma':
+            self.moments.add(x)
+        elif self.n_bars >= self.window and (self.n_bars - self.window) % self.refresh_every == 0:
+            # 視窗剛填滿時與之後每 refresh_every 根 K 棒，由緩衝區從頭重建
+            block = self._train_values()
+            self.moments.reset(shift=block.mean(axis=0)).add(block)
+        elif self.n_bars > self.window:
+            # 加入新列、扣除離開視窗的最舊一列
+            self.moments.add(x)
+            self.moments.remove(oldest)
+        else:
+            self.moments.add(x)
+        return realized, self._maybe_rebalance()
+
+    def _maybe_rebalance(self):
+        if self.n_bars >= self.window and (self.n_bars - self.window) % self.rebalance_freq == 0:
+            return self.rebalance()
+        return None
+
+    def rebalance(self):
+        """以目前的動差狀態計算所有策略的新權重"""
+        start = time.perf_counter()
+        if self.mode == 'ewma':
+            # cov / corr 也由加權緩衝區計算，完整與低秩 RMT、LW 看到的是同一份數據
+            train, n_eff = self._ewma_values()
+            moments = SlidingWindowMoments(len(self.assets)).add(train)
+            estimates = WindowEstimates(moments, train, self.assets)
+            estimates.T = n_eff
+        else:
+            estimates = WindowEstimates(self.moments, self._train_values(), self.assets)
+        weights = {s.name: self._get_weights(s, estimates) for s in self.strategies}
+        self.weights = weights
+        self.latency_ = time.perf_counter() - start
+        self.n_rebalances += 1
+        if self.latency_budget is not None and self.latency_ > self.latency_budget:
+            self.budget_exceeded += 1
+        return weights
+
+    def _get_weights(self, strategy, estimates):
+        try:
+            cov = estimates.covariance(strategy.denoise_method)
+            if isinstance(strategy.optimizer, HRPOptimizer):
+                return strategy.optimizer.get_weights(corr=estimates.corr, cov=cov)
+            # 有限制條件時以上一次調倉的權重暖啟動 (換手率限制也以此為基準)
+            prev = self.weights.get(strategy.name)
+            return strategy.optimizer.get_gmvp_weights(cov, w_prev=None if prev is None else prev.values)
+        except Exception as e:
+            print(f"Optimization failed at bar {self.n_bars}: {e}")
+            return pd.Series(1.0/len(self.assets), index=self.assets)
+
+    def replay(self, returns):
+        """
+        依序重播歷史報酬 (DataFrame)，回傳 (樣本外組合報酬 DataFrame, {策略: 權重列表})
+        與 RollingBacktest.run_strategies 的輸出格式相同
+        """
+        names = [s.name for s in self.strategies]
+        rows, dates = [], []
+        history = {name: [] for name in names}
+        for date, x in zip(returns.index, returns.reindex(columns=self.assets).values):
+            realized, new_weights = self.update(x)
+            if realized:
+                rows.append([realized[name] for name in names])
+                dates.append(date)
+            if new_weights is not None:
+                for name in names:
+                    history[name].append(new_weights[name])
+        return pd.DataFrame(rows, index=dates, columns=names), history
@@ -0,0 +1,164 @@
+import collections
+import copy
+import inspect
+import itertools
+import numpy as np
+import pandas as pd
+from src.backtest import Strategy, compute_weights, _is_path_dependent, _reset_state
+from src.metrics import performance_metrics
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+from src.parallel import n_workers, map_shared, attach_shared
+
+def _label(denoise_method):
+    """去噪方法的預設名稱"""
+    if denoise_method is None:
+        return 'Raw'
+    if isinstance(denoise_method, str):
+        return denoise_method
+    return type(denoise_method).__name__
+
+def _describe(obj):
+    """類別名稱加上與預設值不同的 __init__ 參數，例如 RMTDenoising(fit_sigma2=True)"""
+    params = inspect.signature(type(obj).__init__).parameters.values()
+    changed = [f"{p.name}={getattr(obj, p.name, None)!r}" for p in params
+               if p.name != 'self' and p.default is not inspect.Parameter.empty
+               and getattr(obj, p.name, None) != p.default]
+    return f"{type(obj).__name__}({', '.join(changed)})"
+
+def _named(items, label=_label):
+    """
+    dict 直接使用其名稱；list 以預設名稱命名，
+    名稱重複的物件改以與預設值不同的參數命名 (例如 RMTDenoising(fit_sigma2=True))，仍重複時加上序號
+    """
+    if isinstance(items, dict):
+        return dict(items)
+    items = list(items)
+    labels = [label(item) for item in items]
+    counts = collections.Counter(labels)
+    named = {}
+    for name, item in zip(labels, items):
+        if counts[name] > 1 and item is not None and not isinstance(item, str):
+            name = _describe(item)
+        unique, i = name, 2
+        while unique in named:
+            unique, i = f"{name} #{i}", i + 1
+        named[unique] = item
+    return named
+
+class ParameterSweep:
+    """
+    參數掃描：視窗長度 x 調倉頻率 x 去噪方法 x 優化器
+    windows / rebalance_freqs: 整數列表
+    estimators: {名稱: 去噪方法} (None / 'RMT' / 'LW' / 設定好參數的去噪物件)，或去噪方法列表
+    optimizers: {名稱: 優化器}，或優化器列表 (以類別名稱命名；同類別的多個設定以不同的參數區分)
+    相同視窗長度的所有組合放在同一個任務：只在所有調倉頻率的調倉點聯集上走訪一次，
+    每個視窗的 cov / corr / 特徵值分解 / 去噪結果由所有頻率、去噪方法與優化器共用，
+    之後再依各頻率取出自己的調倉點計算樣本外績效。
+    不同視窗長度的任務交給行程池平行處理 (報酬矩陣只放進共享記憶體一次)。
+    align: 所有組合都以最長視窗之後的同一段期間評估績效，讓指標可以互相比較
+    """
+    def __init__(self, returns, windows=(252,), rebalance_freqs=(21,), estimators=(None, 'RMT', 'LW'),
+                 optimizers=None, align=True, batch_size=32):
+        self.returns = returns
+        self.windows = sorted(set(windows))
+        self.rebalance_freqs = sorted(set(rebalance_freqs))
+        self.estimators = _named(estimators)
+        if optimizers is None:
+            optimizers = {'GMVP': MeanVarianceOptimizer(), 'HRP': HRPOptimizer()}
+        self.optimizers = _named(optimizers, label=lambda opt: type(opt).__name__)
+        self.align = align
+        self.batch_size = batch_size
+
+    @property
+    def strategies(self):
+        """每個視窗共用的策略列表 (名稱為 (去噪方法, 優化器))"""
+        return [Strategy((est, opt), optimizer, denoise_method)
+                for (est, denoise_method), (opt, optimizer)
+                in itertools.product(self.estimators.items(), self.optimizers.items())]
+
+    def run(self, n_jobs=1):
+        """
+        執行所有組合，回傳 tidy 格式的績效表：
+        每列一個 (window, rebalance_freq, estimator, optimizer) 組合，欄位為 src.metrics 的績效指標
+        """
+        values = np.ascontiguousarray(self.returns.values, dtype=float)
+        _check_window(len(values), max(self.windows))
+        start = max(self.windows) if self.align else None
+        n_configs = len(self.windows) * len(self.rebalance_freqs) * len(self.estimators) * len(self.optimizers)
+        print(f"Sweeping {n_configs} configurations over {len(self.windows)} window lengths...")
+        args = (self.returns.index, self.returns.columns, self.rebalance_freqs,
+                self.strategies, start, self.batch_size)
+        n_jobs = n_workers(n_jobs)
+        if n_jobs > 1 and len(self.windows) > 1:
+            # 短視窗的調倉點最多，依序最先送出，避免最後只剩一個大任務
+            tables = map_shared(_run_window, self.windows, values, n_jobs, _init_worker, args)
+        else:
+            tables = [evaluate_window(values, window, *args) for window in self.windows]
+        return pd.concat(tables, ignore_index=True)
+
+def _check_window(T, window):
+    if T <= window:
+        raise ValueError(f"window={window} leaves no rebalance points for {T} rows of returns")
+
+def rebalance_points(T, window, freq):
+    """視窗 window、頻率 freq 的調倉點 (與 RollingBacktest 相同)"""
+    return np.arange(window, T, freq)
+
+def evaluate_window(values, window, dates, assets, rebalance_freqs, strategies, start=None, batch_size=32):
+    """
+    計算單一視窗長度下所有 (調倉頻率, 策略) 的績效
+    1. 在所有頻率調倉點的聯集上計算一次權重 (共用每個視窗的統計量)
+       權重依賴前一次調倉的策略 (換手率限制、沿用樹狀圖的 HRP、子空間追蹤) 則在各頻率自己的調倉點上依序計算
+    2. 各頻率取出自己的調倉點，以 Buy and Hold 計算樣本外報酬與績效指標
+    start: 只以 dates[start:] 的樣本外報酬計算績效 (None 代表從 window 開始)
+    數據不足一個視窗 (T <= window) 時丟出 ValueError
+    """
+    T = len(values)
+    _check_window(T, window)
+    points = {f: rebalance_points(T, window, f) for f in rebalance_freqs}
+    union = np.unique(np.concatenate(list(points.values())))
+    # 增量動差約每滾過一個完整視窗重建一次
+    spacing = (union[-1] - union[0]) / max(1, len(union) - 1) or 1
+    refresh_every = max(1, int(window / spacing))
+    dependent = [s for s in strategies if _is_path_dependent(s)]
+    W, _ = compute_weights(values, assets, window, union.tolist(),
+                           [s for s in strategies if s not in dependent], refresh_every, batch_size)
+    start = window if start is None else start
+    names = [s.name for s in strategies]
+    tables = []
+    for f, pts in points.items():
+        rows = np.searchsorted(union, pts)
+        Wf = {name: w[rows] for name, w in W.items()}
+        if dependent:
+            # 每個 (視窗長度, 頻率) 從全新的狀態開始 (沿用的樹狀圖、追蹤的子空間)，
+            # 結果與網格中有哪些其他組合無關
+            fresh = copy.deepcopy(dependent)
+            _reset_state(fresh)
+            Wf.update(compute_weights(values, assets, window, pts.tolist(), fresh,
+                                      max(1, window // f), batch_size)[0])
+        R = np.empty((T - window, len(strategies)))
+        for k, t in enumerate(pts):
+            # 每個持有期的報酬一次以矩陣乘法計算所有策略
+            test_values = values[t : t+f]
+            R[t-window : t-window+len(test_values)] = np.stack(
+                [test_values @ Wf[name][k] for name in names], axis=1)
+        results = pd.DataFrame(R[start-window:], index=dates[start:], columns=range(len(names)))
+        # 只計入評估期間內的調倉 (換手率)
+        held = pts >= start
+        metrics = performance_metrics(results, {j: Wf[name][held] for j, name in enumerate(names)})
+        metrics.insert(0, 'optimizer', [name[1] for name in names])
+        metrics.insert(0, 'estimator', [name[0] for name in names])
+        metrics.insert(0, 'rebalance_freq', f)
+        metrics.insert(0, 'window', window)
+        tables.append(metrics.reset_index(drop=True))
+    return pd.concat(tables, ignore_index=True)
+
+# 行程池 worker 的狀態 (每個 worker 初始化一次)
+_WORKER = {}
+
+def _init_worker(shm_name, shape, dtype, *args):
+    shm, values = attach_shared(shm_name, shape, dtype)
+    _WORKER.update(shm=shm, values=values, args=args)
+
+def _run_window(window):
+    return evaluate_window(_WORKER['values'], window, *_WORKER['args'])
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+
+class Tracer:
+    """
+    結構化量測：區段計時 (span)、計數器 (counter) 與數值樣本 (sample)
+    span(name, **args): with 區塊計時，args 例如調倉點 t、策略名稱
+    count(name, n): 計數器 (fallback 次數、奇異矩陣次數…)
+    sample(name, values): 數值樣本 (RMT 訊號特徵值個數、條件數…)
+    memory=True 時以 tracemalloc 在每個區段結束時取樣目前的記憶體用量 (tracemalloc 本身會拖慢執行)
+    批次區段 (批次去噪、批次求解 GMVP) 以 ts 列出涵蓋的調倉點 (另有 t_start / t_stop / n_windows)，
+    by_window() 將其耗時平均分攤到這些調倉點
+    結果可匯出為 JSON 或 Chrome trace (chrome://tracing、Perfetto 開啟)
+    """
+    enabled = True
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []    # (name, start, duration, pid, tid, args)
+        self.counters = defaultdict(int)
+        self.samples = defaultdict(list)
+        self.memory_samples = [] # (time, bytes, pid)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def sample(self, name, values):
+        self.samples[name].extend(np.atleast_1d(values).tolist())
+
+    def _record(self, name, start, end, args):
+        pid = os.getpid()
+        self.spans.append((name, start, end - start, pid, threading.get_ident(), args))
+        if self.memory:
+            self.memory_samples.append((end, tracemalloc.get_traced_memory()[0], pid))
+
+    def merge(self, other):
+        """合併其他 Tracer (例如行程池 worker 回傳的量測結果)"""
+        self.spans.extend(other.spans)
+        for name, n in other.counters.items():
+            self.counters[name] += n
+        for name, values in other.samples.items():
+            self.samples[name].extend(values)
+        self.memory_samples.extend(other.memory_samples)
+        return self
+
+    def spans_frame(self):
+        """每個區段一列的 DataFrame (args 展開為欄位)"""
+        rows = [{'name': name, 'start': start, 'duration': dur, **args}
+                for name, start, dur, _, _, args in self.spans]
+        return pd.DataFrame(rows, columns=None if rows else ['name', 'start', 'duration'])
+
+    def summary(self):
+        """依區段名稱彙總：次數、總時間、平均、最大"""
+        df = self.spans_frame()
+        if df.empty:
+            return pd.DataFrame(columns=['count', 'total', 'mean', 'max'])
+        return df.groupby('name')['duration'].agg(['count', 'sum', 'mean', 'max']) \
+                 .rename(columns={'sum': 'total'}).sort_values('total', ascending=False)
+
+    def by_window(self):
+        """
+        每個調倉點 t 在各階段花費的時間 (找出哪個階段超出延遲預算)
+        批次區段的耗時以 duration / n_windows 平均分攤到 ts 中的每個調倉點
+        """
+        df = self.spans_frame()
+        if 'ts' in df:
+            batch = df['ts'].map(lambda ts: isinstance(ts, list) and len(ts) > 0)
+            shared = df[batch].assign(duration=lambda d: d['duration'] / d['ts'].map(len))
+            shared = shared.explode('ts').assign(t=lambda d: d['ts'])
+            df = pd.concat([df[~batch], shared], ignore_index=True)
+        if 't' not in df:
+            return pd.DataFrame()
+        df = df.dropna(subset=['t']).astype({'t': int})
+        return df.pivot_table(index='t', columns='name', values='duration', aggfunc='sum', fill_value=0.0)
+
+    def to_dict(self):
+        return {
+            'spans': [{'name': name, 'start': start, 'duration': dur, 'pid': pid, 'args': args}
+                      for name, start, dur, pid, _, args in self.spans],
+            'counters': dict(self.counters),
+            'samples': {name: values for name, values in self.samples.items()},
+            'memory': [{'time': ts, 'bytes': b, 'pid': pid} for ts, b, pid in self.memory_samples],
+        }
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, default=_jsonable)
+
+    def to_chrome_trace(self, path):
+        """Chrome trace event 格式 (時間單位為微秒)"""
+        origin = min((s[1] for s in self.spans), default=0.0)
+        events = [{'name': name, 'ph': 'X', 'ts': (start - origin) * 1e6, 'dur': dur * 1e6,
+                   'pid': pid, 'tid': tid, 'args': args}
+                  for name, start, dur, pid, tid, args in self.spans]
+        events += [{'name': 'memory', 'ph': 'C', 'ts': (ts - origin) * 1e6, 'pid': pid,
+                    'args': {'MB': b / 2**20}} for ts, b, pid in self.memory_samples]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'otherData': {'counters': dict(self.counters)}},
+                      f, default=_jsonable)
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+class NullTracer:
+    """停用時的 Tracer：所有方法都不做事 (幾乎沒有額外開銷)"""
+    enabled = False
+    memory = False
+    _span = nullcontext()
+
+    def span(self, name, **args):
+        return self._span
+
+    def count(self, name, n=1):
+        pass
+
+    def sample(self, name, values):
+        pass
+
+    def merge(self, other):
+        return self
+
+NULL_TRACER = NullTracer()
+
+def _jsonable(obj):
+    # NumPy 純量與其他物件 (例如 Timestamp) 轉成可序列化的型別
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
@@ -1,9 +1,9 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from src.data_loader import DataLoader
 from src.optimization import MeanVarianceOptimizer, HRPOptimizer
-from src.backtest import RollingBacktest
+from src.backtest import RollingBacktest, Strategy
+from src.metrics import performance_metrics
 
 # 1. 載入數據
 print("Loading data...")
@@ -35,31 +35,21 @@ bt = RollingBacktest(returns, window=252, rebalance_freq=21)
 mv_opt = MeanVarianceOptimizer(long_only=False) # 允許放空
 hrp_opt = HRPOptimizer()
 # 3. 執行策略
-results = pd.DataFrame()
+strategy_results, _ = bt.run_strategies([
+    Strategy('Raw GMVP', mv_opt, denoise_method=None), # Strategy 1: Raw GMVP
+    Strategy('RMT GMVP', mv_opt, denoise_method='RMT'), # Strategy 2: RMT GMVP
+    Strategy('LW GMVP', mv_opt, denoise_method='LW'), # Strategy 3: LW GMVP
+    Strategy('HRP', hrp_opt), # Strategy 4: HRP
+])
 # Benchmark: Equal Weight
 ew_ret = returns.mean(axis=1) # 簡單平均
 ew_ret.name = 'Equal Weight'
 # 為了對齊時間，我們只取回測開始後的時間段
-start_date = bt.run_strategy('Dummy', mv_opt).index[0] 
-results['Equal Weight'] = ew_ret.loc[start_date:]
-# Strategy 1: Raw GMVP
-results['Raw GMVP'] = bt.run_strategy('Raw GMVP', mv_opt, denoise_method=None)
-# Strategy 2: RMT GMVP
-results['RMT GMVP'] = bt.run_strategy('RMT GMVP', mv_opt, denoise_method='RMT')
-# Strategy 3: LW GMVP
-results['LW GMVP'] = bt.run_strategy('LW GMVP', mv_opt, denoise_method='LW')
-# Strategy 4: HRP
-results['HRP'] = bt.run_strategy('HRP', hrp_opt)
+results = pd.concat([ew_ret.loc[strategy_results.index], strategy_results], axis=1)
 # 4. 顯示績效指標
 print("\n=== Backtest Results (Annualized) ===")
-stats = pd.DataFrame()
-for col in results.columns:
-    ann_ret = results[col].mean() * 252
-    ann_vol = results[col].std() * np.sqrt(252)
-    sharpe = ann_ret / ann_vol
-    stats.loc[col, 'Return'] = f"{ann_ret*100:.2f}%"
-    stats.loc[col, 'Volatility'] = f"{ann_vol*100:.2f}%"
-    stats.loc[col, 'Sharpe'] = f"{sharpe:.2f}"
+stats = performance_metrics(results, bt.weights_history)
+stats = stats.style.format("{:.2%}", subset=['Return', 'Volatility', 'Max Drawdown']).format("{:.2f}", subset=['Sharpe', 'Sortino', 'Calmar', 'Turnover']).to_string()
 print(stats)
 # 5. 畫累積報酬圖
 (1 + results).cumprod().plot(figsize=(10, 6))
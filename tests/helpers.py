@@ -0,0 +1,73 @@
+"""
+測試用的參考實作 (固定不變，作為加速版本的比較基準)
+"""
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as sch
+from scipy.spatial.distance import squareform
+
+def _legacy_quasi_diag(link):
+    """原始 pandas Series 版本的 quasi-diagonalization"""
+    link = link.astype(int)
+    sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
+    num_items = link[-1, 3]
+    while sort_ix.max() >= num_items:
+        sort_ix.index = range(0, sort_ix.shape[0] * 2, 2)
+        df0 = sort_ix[sort_ix >= num_items]
+        i = df0.index
+        j = df0.values - num_items
+        sort_ix[i] = link[j, 0]
+        df0 = pd.Series(link[j, 1], index=i + 1)
+        sort_ix = pd.concat([sort_ix, df0])
+        sort_ix = sort_ix.sort_index()
+        sort_ix.index = range(sort_ix.shape[0])
+    return sort_ix.tolist()
+
+def _legacy_cluster_var(cov, c_items):
+    cov_slice = cov.loc[c_items, c_items]
+    ivp = 1 / np.diag(cov_slice)
+    ivp /= ivp.sum()
+    w = ivp.reshape(-1, 1)
+    return np.dot(np.dot(w.T, cov_slice), w)[0, 0]
+
+def _legacy_rec_bisection(cov, sort_ix):
+    """原始以標籤查找的遞迴二分法"""
+    w = pd.Series(1.0, index=sort_ix)
+    c_items = [sort_ix]
+    while len(c_items) > 0:
+        c_items = [i[j:k] for i in c_items for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if len(i) > 1]
+        for i in range(0, len(c_items), 2):
+            c_var0 = _legacy_cluster_var(cov, c_items[i])
+            c_var1 = _legacy_cluster_var(cov, c_items[i + 1])
+            alpha = 1 - c_var0 / (c_var0 + c_var1)
+            w[c_items[i]] *= alpha
+            w[c_items[i + 1]] *= 1 - alpha
+    return w
+
+def legacy_hrp(corr, cov):
+    """原始 HRPOptimizer.get_weights (corr / cov 為 DataFrame)"""
+    dist = np.sqrt(0.5 * (1 - corr.values))
+    link = sch.linkage(squareform(dist), 'single')
+    sort_ix = corr.index[_legacy_quasi_diag(link)].tolist()
+    weights = _legacy_rec_bisection(cov.loc[sort_ix, sort_ix], sort_ix)
+    return weights.loc[corr.index]
+
+def legacy_metrics(results, periods=252):
+    """原始 main.py 逐欄 pandas 版本的績效指標 (Return, Volatility, Sharpe, Max Drawdown)"""
+    metrics = []
+    for col in results.columns:
+        ann_ret = results[col].mean() * periods
+        ann_vol = results[col].std() * np.sqrt(periods)
+        sharpe = ann_ret / ann_vol if ann_vol != 0 else 0
+        max_dd = (results[col] + 1).cumprod().div((results[col] + 1).cumprod().cummax()).sub(1).min()
+        metrics.append({'Strategy': col, 'Return': ann_ret, 'Volatility': ann_vol,
+                        'Sharpe': sharpe, 'Max Drawdown': max_dd})
+    return pd.DataFrame(metrics).set_index('Strategy')
+
+def legacy_rolling_metrics(results, window, periods=252):
+    """以 pandas rolling 逐欄計算的滾動績效"""
+    ann_ret = results.rolling(window).mean() * periods
+    ann_vol = results.rolling(window).std() * np.sqrt(periods)
+    max_dd = results.rolling(window).apply(
+        lambda r: ((1 + r).cumprod() / (1 + r).cumprod().cummax() - 1).min(), raw=False)
+    return {'Return': ann_ret, 'Volatility': ann_vol, 'Sharpe': ann_ret / ann_vol, 'Max Drawdown': max_dd}
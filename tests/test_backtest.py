@@ -0,0 +1,64 @@
+"""
+RollingBacktest 的行為 (合成數據)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import factor_returns
+from src.backtest import RollingBacktest, WeightsHistory
+from src.denoise import RMTDenoising
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+from src.tracing import Tracer
+
+@pytest.fixture(scope='module')
+def returns():
+    return factor_returns(n_assets=20, n_days=300, n_factors=3, seed=3)
+
+def test_condition_numbers_without_tracer(returns):
+    bt = RollingBacktest(returns, window=120, rebalance_freq=30)
+    bt.run_strategies([('Raw', MeanVarianceOptimizer()), ('RMT', MeanVarianceOptimizer(), 'RMT')])
+    for info in bt.diagnostics.values():
+        assert len(info) == 6
+        assert np.isfinite(info['cond']).all() and (info['cond'] >= 1).all()
+
+@pytest.mark.parametrize('tracer', [None, Tracer()])
+def test_condition_numbers_can_be_disabled(returns, tracer):
+    bt = RollingBacktest(returns, window=120, rebalance_freq=30, tracer=tracer, diagnostics=False)
+    bt.run_strategies([('Raw', MeanVarianceOptimizer())])
+    assert bt.diagnostics['Raw']['cond'].isna().all()
+
+def test_rerun_with_same_drift_hrp_is_reproducible(returns):
+    def run(data, hrp):
+        return RollingBacktest(data, window=120, rebalance_freq=10).run_strategies([('HRP', hrp)])[1]['HRP']
+    fresh = run(returns, HRPOptimizer(drift_threshold=0.05))
+    hrp = HRPOptimizer(drift_threshold=0.05)
+    # 先在另一段數據上執行，留下沿用的樹狀圖與參考距離矩陣
+    run(returns.iloc[::-1], hrp)
+    np.testing.assert_array_equal(np.asarray(run(returns, hrp)), np.asarray(fresh))
+
+def test_rerun_with_same_tracking_rmt_is_reproducible(returns):
+    def run(data, rmt):
+        bt = RollingBacktest(data, window=120, rebalance_freq=10)
+        return bt.run_strategies([('RMT', MeanVarianceOptimizer(), rmt)])[1]['RMT']
+    fresh = run(returns, RMTDenoising(method='tracking'))
+    rmt = RMTDenoising(method='tracking')
+    run(returns.iloc[::-1], rmt)
+    np.testing.assert_array_equal(np.asarray(run(returns, rmt)), np.asarray(fresh))
+
+def test_weights_history_indexing():
+    values = np.arange(12.0).reshape(4, 3)
+    dates = pd.bdate_range('2021-01-01', periods=4)
+    h = WeightsHistory(values, dates, ['A', 'B', 'C'])
+    assert h[-1].name == dates[-1] and list(h[np.int64(1)]) == [3.0, 4.0, 5.0]
+    mask = np.array([True, False, True, False])
+    for key in (mask, pd.Series(mask), [0, 2], np.array([0, 2])):
+        sub = h[key]
+        assert isinstance(sub, WeightsHistory)
+        np.testing.assert_array_equal(np.asarray(sub), values[[0, 2]])
+        assert list(sub.dates) == [dates[0], dates[2]]
+    assert len(h[[]]) == 0
+    assert len(h[1:3]) == 2
+    with pytest.raises(TypeError, match='to_frame'):
+        h[dates[0]]
+    with pytest.raises(TypeError):
+        h[[0.5, 1.5]]
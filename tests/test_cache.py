@@ -0,0 +1,81 @@
+"""
+磁碟快取 (src.cache)
+"""
+import os
+import numpy as np
+import pytest
+import src.cache
+from benchmarks.synthetic import factor_returns
+from src.backtest import RollingBacktest
+from src.cache import DiskCache, fingerprint, hash_array
+from src.denoise import RMTDenoising
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+
+def test_key_is_stable_and_depends_on_every_part(tmp_path, monkeypatch):
+    a, b = DiskCache(str(tmp_path / 'a')), DiskCache(str(tmp_path / 'b'))
+    data = hash_array(np.arange(6.0).reshape(2, 3))
+    key = a.key(data, 'cov', fingerprint(RMTDenoising()))
+    assert key == b.key(data, 'cov', fingerprint(RMTDenoising()))
+    assert key != a.key(data, 'cov', fingerprint(RMTDenoising(alpha=3.0)))
+    assert key != a.key(hash_array(np.arange(6.0).reshape(3, 2)), 'cov', fingerprint(RMTDenoising()))
+    assert key != a.key(hash_array(np.arange(6.0, dtype=np.float32).reshape(2, 3)), 'cov',
+                        fingerprint(RMTDenoising()))
+    # 程式碼一改，所有鍵都不同
+    monkeypatch.setattr(src.cache, '_CODE_VERSION', 'other')
+    assert key != a.key(data, 'cov', fingerprint(RMTDenoising()))
+
+def test_fingerprint_ignores_fitted_state():
+    rmt = RMTDenoising()
+    before = fingerprint(rmt)
+    rmt.fit(np.random.default_rng(0).normal(size=(100, 10)))
+    assert fingerprint(rmt) == before
+
+def test_hit_and_miss(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = cache.key('x')
+    assert cache.get(key) is None
+    cache.put(key, a=np.arange(3), b=np.eye(2))
+    entry = cache.get(key)
+    np.testing.assert_array_equal(entry['a'], np.arange(3))
+    np.testing.assert_array_equal(entry['b'], np.eye(2))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_lru_eviction_by_mtime(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=2**30)
+    keys = [cache.key(i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, a=np.full(1000, i, dtype=float))
+        os.utime(cache._file(key), (1000 + i, 1000 + i))
+    # 讀取最舊的項目會更新其使用時間，下一個最舊的項目先被淘汰
+    assert cache.get(keys[0]) is not None
+    size = os.path.getsize(cache._file(keys[0]))
+    assert cache.evict(2 * size) <= 2 * size
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+def test_put_evicts_when_over_budget(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=20000)
+    for i in range(10):
+        cache.put(cache.key(i), a=np.zeros(1000))
+    assert cache.size() <= 20000
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_cached_backtest_matches_cold_run(tmp_path, n_jobs):
+    returns = factor_returns(n_assets=20, n_days=300, n_factors=3, seed=4)
+    mv = MeanVarianceOptimizer()
+    strategies = [('Raw', mv), ('RMT', mv, 'RMT'), ('LW', mv, 'LW'), ('HRP', HRPOptimizer()),
+                  ('Capped', MeanVarianceOptimizer(long_only=True, max_weight=0.1), 'RMT')]
+    def run(cache):
+        bt = RollingBacktest(returns, window=120, rebalance_freq=20, cache=cache)
+        results, weights = bt.run_strategies(strategies, n_jobs=n_jobs)
+        return results, {name: np.asarray(w) for name, w in weights.items()}, bt.diagnostics
+    base, w_base, diag_base = run(None)
+    cache = DiskCache(str(tmp_path))
+    for _ in range(2): # 冷啟動 (寫入) 與命中
+        results, w, diag = run(cache)
+        assert results.equals(base)
+        for name in w_base:
+            np.testing.assert_array_equal(w[name], w_base[name])
+            if name in diag_base:
+                np.testing.assert_array_equal(diag[name]['cond'].values, diag_base[name]['cond'].values)
+    assert cache.hits > 0
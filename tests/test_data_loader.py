@@ -0,0 +1,86 @@
+"""
+DataLoader 增量抓取 (離線，以 FileProvider 代替 yfinance)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_loader import DataLoader
+from src.price_store import PriceStore
+from src.providers import FileProvider
+
+@pytest.fixture
+def prices():
+    index = pd.bdate_range('2020-01-01', '2020-06-30')
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(index), 3)), axis=0))
+    return pd.DataFrame(values, index=index, columns=['AAA', 'BBB', 'CCC'])
+
+def _loader(tmp_path, provider, tickers=('AAA', 'BBB', 'CCC'), start='2020-01-01', end='2020-04-01', **kwargs):
+    return DataLoader(list(tickers), start, end, data_dir=str(tmp_path), provider=provider, **kwargs)
+
+def _spy(monkeypatch, calls):
+    for name in ('_append', '_rewrite'):
+        original = getattr(PriceStore, name)
+        def wrapped(self, *args, _name=name, _original=original):
+            calls.append(_name)
+            return _original(self, *args)
+        monkeypatch.setattr(PriceStore, name, wrapped)
+
+def test_find_gaps_groups_tickers_by_missing_range(tmp_path, prices):
+    loader = _loader(tmp_path, FileProvider(prices))
+    loader.store._add_coverage('AAA', '2020-01-01', '2020-02-01')
+    gaps = loader.find_gaps()
+    assert gaps == [
+        (pd.Timestamp('2020-01-01'), pd.Timestamp('2020-04-01'), ['BBB', 'CCC']),
+        (pd.Timestamp('2020-02-01'), pd.Timestamp('2020-04-01'), ['AAA']),
+    ]
+
+def test_second_run_makes_no_provider_calls(tmp_path, prices):
+    provider = FileProvider(prices)
+    df = _loader(tmp_path, provider).fetch_data()
+    assert len(provider.calls) == 1
+    again = _loader(tmp_path, provider).fetch_data()
+    assert len(provider.calls) == 1
+    pd.testing.assert_frame_equal(df, again)
+    expected = prices.loc['2020-01-01':'2020-03-31']
+    np.testing.assert_array_equal(again.values, expected.values)
+
+def test_later_end_appends_and_earlier_start_rewrites(tmp_path, prices, monkeypatch):
+    provider = FileProvider(prices)
+    _loader(tmp_path, provider, start='2020-02-03').update()
+    calls = []
+    _spy(monkeypatch, calls)
+    # 新日期都在最後一天之後：只 append 新的一段
+    _loader(tmp_path, provider, start='2020-02-03', end='2020-05-01').update()
+    assert calls == ['_append']
+    assert provider.calls[-1][1:] == (pd.Timestamp('2020-04-01'), pd.Timestamp('2020-05-01'))
+    # 補前面的歷史：重寫整個資料庫
+    calls.clear()
+    df = _loader(tmp_path, provider, start='2020-01-01', end='2020-05-01').fetch_data()
+    assert calls == ['_rewrite']
+    assert provider.calls[-1][1:] == (pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-03'))
+    np.testing.assert_array_equal(df.values, prices.loc['2020-01-01':'2020-04-30'].values)
+
+def test_empty_ticker_is_retried_after_ttl(tmp_path, prices):
+    provider = FileProvider(prices)
+    loader = _loader(tmp_path, provider, tickers=['AAA', 'ZZZ'], empty_ttl='1D')
+    loader.update()
+    assert not loader.store.covers('ZZZ', '2020-01-01', '2020-04-01')
+    assert loader.store.covers('AAA', '2020-01-01', '2020-04-01')
+    # TTL 內不再請求
+    assert _loader(tmp_path, provider, tickers=['AAA', 'ZZZ'], empty_ttl='1D').update() == 0
+    assert len(provider.calls) == 1
+    # TTL 過後重試
+    retry = _loader(tmp_path, provider, tickers=['AAA', 'ZZZ'], empty_ttl='0s')
+    assert retry.update() == 1
+    assert provider.calls[-1][0] == ['ZZZ']
+
+def test_range_without_trading_days_is_covered(tmp_path, prices):
+    provider = FileProvider(prices)
+    # 2020-01-04 ~ 2020-01-06 (不含) 是週末，來源成功回傳但沒有任何交易日
+    loader = _loader(tmp_path, provider, start='2020-01-04', end='2020-01-06')
+    loader.update()
+    assert all(loader.store.covers(t, '2020-01-04', '2020-01-06') for t in loader.tickers)
+    assert loader.store.meta['empty'] == {}
+    assert _loader(tmp_path, provider, start='2020-01-04', end='2020-01-06', empty_ttl='0s').update() == 0
+    assert len(provider.calls) == 1
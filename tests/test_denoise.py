@@ -0,0 +1,75 @@
+"""
+去噪器 (合成數據)
+"""
+import numpy as np
+import pytest
+from benchmarks.synthetic import factor_returns
+from src.denoise import RMTDenoising, FactorCovariance
+from src.optimization import MeanVarianceOptimizer
+
+def _daily_corrs(n_factors, n_windows, N=60, window=240, seed=0):
+    """相鄰 (每日滑動) 視窗的相關係數矩陣"""
+    X = factor_returns(N, window + n_windows, n_factors, seed=seed).values
+    return [np.corrcoef(X[t : t+window], rowvar=False) for t in range(n_windows)]
+
+def _full(corr, T):
+    return RMTDenoising().fit_corr(corr, T).transform()
+
+def test_tracking_follows_adjacent_windows():
+    rmt = RMTDenoising(method='tracking')
+    for corr in _daily_corrs(3, 5):
+        np.testing.assert_allclose(rmt.fit_corr(corr, 240).transform(), _full(corr, 240), atol=1e-10)
+    # 第一次沒有子空間可用，之後都由追蹤完成
+    assert (rmt.n_fallbacks_, rmt.n_tracked_) == (1, 4)
+
+def test_tracking_falls_back_when_signal_count_changes():
+    rmt = RMTDenoising(method='tracking')
+    for corr in _daily_corrs(2, 2):
+        rmt.fit_corr(corr, 240)
+    corr = _daily_corrs(5, 1, seed=1)[0]
+    np.testing.assert_allclose(rmt.fit_corr(corr, 240).transform(), _full(corr, 240), atol=1e-10)
+    assert rmt.n_fallbacks_ == 2 and rmt.eigenvectors_.shape[1] == 5
+
+def test_tracking_falls_back_when_guard_crosses_edge():
+    # 沒有保護向量時，追蹤到的向量全部是訊號，無法排除子空間外還有新訊號
+    rmt = RMTDenoising(method='tracking', n_guard=0)
+    for corr in _daily_corrs(3, 3):
+        np.testing.assert_allclose(rmt.fit_corr(corr, 240).transform(), _full(corr, 240), atol=1e-10)
+    assert (rmt.n_fallbacks_, rmt.n_tracked_) == (3, 0)
+
+def test_tracking_falls_back_without_convergence():
+    rmt = RMTDenoising(method='tracking', max_iter=1, tol=1e-30)
+    for corr in _daily_corrs(3, 3):
+        np.testing.assert_allclose(rmt.fit_corr(corr, 240).transform(), _full(corr, 240), atol=1e-10)
+    assert (rmt.n_fallbacks_, rmt.n_tracked_) == (3, 0)
+
+def test_reset_subspace_restarts_from_full_eigh():
+    rmt = RMTDenoising(method='tracking')
+    corrs = _daily_corrs(3, 2)
+    for corr in corrs:
+        rmt.fit_corr(corr, 240)
+    rmt.reset_subspace()
+    assert rmt.subspace_ is None
+    rmt.fit_corr(corrs[-1], 240)
+    assert (rmt.n_fallbacks_, rmt.n_tracked_) == (1, 0)
+
+def _factor_cov(N=50, k=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return FactorCovariance(rng.normal(0, 0.1, (N, k)), rng.uniform(0.5, 2, k), rng.uniform(1e-4, 1e-3, N))
+
+def test_factor_covariance_solve_matches_dense():
+    cov = _factor_cov()
+    dense = cov.to_dense()
+    b = np.random.default_rng(1).normal(size=(50, 3))
+    np.testing.assert_allclose(cov.solve(b), np.linalg.solve(dense, b), rtol=1e-9)
+    np.testing.assert_allclose(cov.solve(b[:, 0]), np.linalg.solve(dense, b[:, 0]), rtol=1e-9)
+    # 因子變異數為 0 時不需要 F^-1
+    zero = FactorCovariance(cov.loadings, np.r_[cov.factor_variances[:-1], 0.0], cov.diagonal)
+    np.testing.assert_allclose(zero.solve(b), np.linalg.solve(zero.to_dense(), b), rtol=1e-9)
+
+@pytest.mark.parametrize('optimizer', [MeanVarianceOptimizer(), MeanVarianceOptimizer(long_only=True, max_weight=0.05)])
+def test_factor_gmvp_matches_dense(optimizer):
+    cov = _factor_cov(seed=2)
+    w = optimizer.get_gmvp_weights(cov)
+    w_dense = optimizer.get_gmvp_weights(cov.to_dense())
+    np.testing.assert_allclose(w.values, w_dense.values, rtol=0, atol=1e-10)
@@ -0,0 +1,93 @@
+"""
+加速路徑與原始路徑的等價性檢查 (合成數據，不需網路)
+"""
+import numpy as np
+import pytest
+from benchmarks.synthetic import factor_returns
+from src.backtest import RollingBacktest
+from src.denoise import RMTDenoising
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+from src.streaming import StreamingRebalancer
+from tests.helpers import legacy_hrp
+
+WINDOW, FREQ = 120, 20
+
+@pytest.fixture(scope='module')
+def returns():
+    return factor_returns(n_assets=30, n_days=400, n_factors=3, seed=1)
+
+def _strategies():
+    mv = MeanVarianceOptimizer()
+    return [('Raw', mv), ('RMT', mv, 'RMT'), ('LW', mv, 'LW'), ('HRP', HRPOptimizer())]
+
+def _run(returns, **kwargs):
+    n_jobs = kwargs.pop('n_jobs', 1)
+    bt = RollingBacktest(returns, window=WINDOW, rebalance_freq=FREQ, **kwargs)
+    return bt.run_strategies(_strategies(), n_jobs=n_jobs)
+
+def _stack(history):
+    return {name: np.array([w.values for w in ws]) for name, ws in history.items()}
+
+def test_parallel_matches_serial(returns):
+    serial, w_serial = _run(returns)
+    parallel, w_parallel = _run(returns, n_jobs=2)
+    assert serial.equals(parallel)
+    a, b = _stack(w_serial), _stack(w_parallel)
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name])
+
+def test_batched_matches_per_window(returns):
+    batched, w_batched = _run(returns, batched=True)
+    single, w_single = _run(returns, batched=False)
+    np.testing.assert_allclose(batched.values, single.values, rtol=0, atol=1e-10)
+    a, b = _stack(w_batched), _stack(w_single)
+    for name in a:
+        np.testing.assert_allclose(a[name], b[name], rtol=0, atol=1e-8, err_msg=name)
+
+def test_rmt_configs_share_one_eigh_per_window(returns, monkeypatch):
+    mv = MeanVarianceOptimizer()
+    configs = [('RMT', mv, 'RMT'), ('RMT_mc', mv, RMTDenoising(edge='monte_carlo', n_surrogates=20)),
+               ('RMT_fit', mv, RMTDenoising(fit_sigma2=True))]
+    alone = {name: _stack(RollingBacktest(returns, window=WINDOW, rebalance_freq=FREQ)
+                          .run_strategies([(name, opt, method)])[1])[name]
+             for name, opt, method in configs}
+    decomposed = []
+    eigh = np.linalg.eigh
+    def counting_eigh(a, *args, **kwargs):
+        decomposed.append(1 if np.ndim(a) == 2 else len(a))
+        return eigh(a, *args, **kwargs)
+    monkeypatch.setattr(np.linalg, 'eigh', counting_eigh)
+    bt = RollingBacktest(returns, window=WINDOW, rebalance_freq=FREQ)
+    _, history = bt.run_strategies(configs)
+    # 每個視窗只做一次相關係數的特徵值分解
+    assert sum(decomposed) == len(range(WINDOW, len(returns), FREQ))
+    for name, w in _stack(history).items():
+        np.testing.assert_array_equal(w, alone[name])
+
+def test_streaming_replay_matches_backtest(returns):
+    batch, w_batch = _run(returns)
+    stream = StreamingRebalancer(returns.columns, _strategies(), window=WINDOW, rebalance_freq=FREQ)
+    live, w_live = stream.replay(returns)
+    np.testing.assert_allclose(live.values, batch.values, rtol=0, atol=1e-10)
+    # 串流在最後一根 K 棒也會調倉 (供下一根使用)，只比較批次回測有的調倉點
+    a, b = _stack(w_live), _stack(w_batch)
+    for name in a:
+        np.testing.assert_allclose(a[name][:len(b[name])], b[name], rtol=0, atol=1e-8, err_msg=name)
+
+@pytest.mark.parametrize('method', ['svd', 'randomized'])
+def test_streaming_ewma_low_rank_matches_full(returns, method):
+    mv = MeanVarianceOptimizer()
+    strategies = [('full', mv, RMTDenoising()), ('low_rank', mv, RMTDenoising(method=method))]
+    stream = StreamingRebalancer(returns.columns, strategies, window=WINDOW, rebalance_freq=FREQ,
+                                 mode='ewma', halflife=40)
+    _, history = stream.replay(returns)
+    w = _stack(history)
+    np.testing.assert_allclose(w['low_rank'], w['full'], rtol=0, atol=1e-10)
+
+@pytest.mark.parametrize('n_assets', [2, 17, 64])
+def test_hrp_matches_legacy(n_assets):
+    data = factor_returns(n_assets=n_assets, n_days=252, seed=n_assets)
+    corr, cov = data.corr(), data.cov()
+    expected = legacy_hrp(corr, cov)
+    actual = HRPOptimizer().get_weights(corr=corr, cov=cov)
+    np.testing.assert_array_equal(actual.values, expected.values)
@@ -0,0 +1,60 @@
+"""
+向量化績效指標 (src.metrics) 與原始逐欄 pandas 實作比較
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.metrics import performance_metrics, rolling_metrics, bootstrap_indices, bootstrap_ci, turnover
+from tests.helpers import legacy_metrics, legacy_rolling_metrics
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2020-01-01', periods=400)
+    values = rng.normal(3e-4, 0.01, (len(index), 4)) * [1, 2, 0.5, 1.5]
+    frame = pd.DataFrame(values, index=index, columns=['EW', 'MV', 'HRP', 'RP'])
+    frame['Cash'] = 0.0  # 零波動：Sharpe 以 0 代替除以零
+    return frame
+
+def test_performance_metrics_match_pandas(returns):
+    ours = performance_metrics(returns)
+    ref = legacy_metrics(returns)
+    pd.testing.assert_frame_equal(ours[ref.columns], ref, check_exact=False, rtol=1e-12, atol=1e-15)
+
+def test_rolling_metrics_match_pandas(returns):
+    window = 63
+    ours = rolling_metrics(returns, window)
+    ref = legacy_rolling_metrics(returns, window)
+    risky = ['EW', 'MV', 'HRP', 'RP']
+    for name, frame in ref.items():
+        frame = frame.iloc[window - 1:]
+        cols = risky if name == 'Sharpe' else list(returns.columns)
+        np.testing.assert_allclose(ours[name][cols].values, frame[cols].values, rtol=1e-9, atol=1e-12)
+        assert ours[name].index.equals(frame.index)
+    assert (ours['Sharpe']['Cash'] == 0).all()
+
+def test_turnover_from_weight_list():
+    weights = [pd.Series([0.5, 0.5]), pd.Series([0.7, 0.3]), pd.Series([0.6, 0.4])]
+    assert turnover(weights) == pytest.approx((0.4 + 0.2) / 2)
+    assert turnover(weights[:1]) == 0.0
+
+@pytest.mark.parametrize('method', ['stationary', 'block'])
+@pytest.mark.parametrize('T, block_size', [(50, 5), (7, 10), (1, 3)])
+def test_bootstrap_indices_shape_and_range(method, T, block_size):
+    idx = bootstrap_indices(T, 20, method, block_size, rng=0)
+    assert idx.shape == (20, T)
+    assert idx.min() >= 0 and idx.max() < T
+
+def test_block_bootstrap_keeps_blocks_contiguous():
+    idx = bootstrap_indices(30, 10, 'block', 5, rng=1)
+    blocks = idx.reshape(10, 6, 5)
+    assert (np.diff(blocks, axis=-1) == 1).all()
+    # 序列比區塊短時，區塊即為整段序列
+    np.testing.assert_array_equal(bootstrap_indices(4, 3, 'block', 10, rng=0), np.tile(np.arange(4), (3, 1)))
+
+def test_bootstrap_ci_short_series_with_long_block(returns):
+    ci = bootstrap_ci(returns.iloc[:8], n_boot=200, method='block', block_size=20, benchmark='EW')
+    # 區塊縮為整段序列，每次重抽樣都是原序列本身，區間退化為點估計
+    np.testing.assert_allclose(ci['Sharpe Low'], ci['Sharpe'], rtol=1e-12)
+    np.testing.assert_allclose(ci['Sharpe High'], ci['Sharpe'], rtol=1e-12)
+    assert np.isnan(ci.loc['EW', 'p-value'])
@@ -0,0 +1,94 @@
+"""
+有限制條件的最小變異數求解器 (active-set / ADMM) 與 scipy SLSQP 參考解比較
+"""
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+from src.min_variance import solve_active_set, solve_turnover
+
+def _random_spd(N, seed, T=None):
+    """T 個樣本的樣本協方差 (T <= N 時為奇異矩陣)"""
+    rng = np.random.default_rng(seed)
+    T = 3 * N if T is None else T
+    B = rng.normal(0, 1, (N, 3))
+    X = rng.normal(0, 0.01, (T, 3)) @ B.T + rng.normal(0, 0.02, (T, N)) * rng.uniform(0.5, 2, N)
+    return np.cov(X, rowvar=False)
+
+def _reference(cov, lower, upper, w_prev=None, max_turnover=None):
+    """SLSQP 參考解；換手率限制以 w = w_prev + p - m (p, m >= 0) 改寫成平滑問題"""
+    N = len(cov)
+    if max_turnover is None:
+        res = minimize(lambda w: w @ cov @ w, np.full(N, 1.0 / N), jac=lambda w: 2 * cov @ w,
+                       bounds=[(lower, upper)] * N, method='SLSQP',
+                       constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1}],
+                       options={'ftol': 1e-15, 'maxiter': 1000})
+        return res.x
+    def split(x):
+        return w_prev + x[:N] - x[N:]
+    cons = [{'type': 'eq', 'fun': lambda x: split(x).sum() - 1},
+            {'type': 'ineq', 'fun': lambda x: max_turnover - x.sum()},
+            {'type': 'ineq', 'fun': lambda x: split(x) - lower},
+            {'type': 'ineq', 'fun': lambda x: upper - split(x)}]
+    res = minimize(lambda x: split(x) @ cov @ split(x), np.zeros(2 * N), bounds=[(0, None)] * (2 * N),
+                   method='SLSQP', constraints=cons, options={'ftol': 1e-15, 'maxiter': 1000})
+    return split(res.x)
+
+def _assert_feasible(w, lower, upper, w_prev=None, max_turnover=None, atol=1e-9):
+    assert abs(w.sum() - 1) < atol
+    assert np.all(w >= lower - atol) and np.all(w <= upper + atol)
+    if max_turnover is not None:
+        assert np.abs(w - w_prev).sum() <= max_turnover + 1e-6
+
+def _assert_kkt(cov, w, lower, upper, atol=1e-9):
+    """Sigma w = mu 1 + lambda_lower - lambda_upper，乘數非負"""
+    grad = cov @ w
+    at_lower, at_upper = np.isclose(w, lower, atol=1e-12), np.isclose(w, upper, atol=1e-12)
+    free = ~(at_lower | at_upper)
+    mu = grad[free].mean()
+    scale = np.abs(grad).max()
+    np.testing.assert_allclose(grad[free], mu, rtol=0, atol=atol * scale)
+    assert np.all(grad[at_lower] >= mu - atol * scale)
+    assert np.all(grad[at_upper] <= mu + atol * scale)
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('upper', [np.inf, 0.08])
+def test_active_set_matches_reference(seed, upper):
+    cov = _random_spd(30, seed)
+    w, _ = solve_active_set(cov, 0.0, upper, np.full(30, 1 / 30))
+    _assert_feasible(w, 0.0, upper)
+    _assert_kkt(cov, w, 0.0, upper)
+    ref = _reference(cov, 0.0, upper)
+    assert w @ cov @ w <= ref @ cov @ ref * (1 + 1e-8)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_turnover_matches_reference(seed):
+    cov = _random_spd(20, seed)
+    w_prev = np.full(20, 1 / 20)
+    w, _ = solve_turnover(cov, 0.0, 0.12, w_prev, max_turnover=0.3)
+    _assert_feasible(w, 0.0, 0.12, w_prev, 0.3)
+    ref = _reference(cov, 0.0, 0.12, w_prev, 0.3)
+    np.testing.assert_allclose(w @ cov @ w, ref @ cov @ ref, rtol=1e-5)
+
+def test_warm_start_reduces_iterations():
+    cov = _random_spd(60, 0)
+    w_cold, it_cold = solve_active_set(cov, 0.0, 0.05, np.full(60, 1 / 60))
+    # 相鄰調倉的協方差只有小幅變化，從上一次的最優解出發
+    cov_next = cov + 1e-3 * np.diag(np.diag(cov))
+    w_next, it_cold_next = solve_active_set(cov_next, 0.0, 0.05, np.full(60, 1 / 60))
+    w_warm, it_warm = solve_active_set(cov_next, 0.0, 0.05, w_cold)
+    assert it_warm < it_cold_next
+    np.testing.assert_allclose(w_warm, w_next, rtol=0, atol=1e-12)
+    # 從最優解出發只需確認一次 KKT 條件
+    assert solve_active_set(cov, 0.0, 0.05, w_cold)[1] == 1
+
+def test_singular_covariance_uses_lstsq(monkeypatch):
+    cov = _random_spd(40, 1, T=20)
+    assert np.linalg.matrix_rank(cov) < 40
+    calls = []
+    lstsq = np.linalg.lstsq
+    monkeypatch.setattr(np.linalg, 'lstsq', lambda *a, **k: calls.append(1) or lstsq(*a, **k))
+    w, _ = solve_active_set(cov, -0.1, 0.2, np.full(40, 1 / 40))
+    assert calls
+    _assert_feasible(w, -0.1, 0.2)
+    ref = _reference(cov, -0.1, 0.2)
+    assert w @ cov @ w <= ref @ cov @ ref * (1 + 1e-6) + 1e-15
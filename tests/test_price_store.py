@@ -0,0 +1,70 @@
+"""
+欄式價格資料庫 (src.price_store)
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.price_store import PriceStore
+
+@pytest.fixture
+def prices():
+    index = pd.bdate_range('2021-01-01', periods=40).as_unit('ns')
+    values = np.arange(40 * 4, dtype=float).reshape(40, 4)
+    values[5:8, 2] = np.nan
+    return pd.DataFrame(values, index=index, columns=['AAA', 'BBB', 'CCC', 'DDD'])
+
+def _spy(monkeypatch):
+    calls = []
+    for name in ('_append', '_rewrite'):
+        original = getattr(PriceStore, name)
+        def wrapped(self, *args, _name=name, _original=original):
+            calls.append(_name)
+            return _original(self, *args)
+        monkeypatch.setattr(PriceStore, name, wrapped)
+    return calls
+
+def test_load_subset_of_tickers_and_dates(tmp_path, prices):
+    store = PriceStore(str(tmp_path))
+    store.write(prices)
+    df = store.load(['CCC', 'AAA', 'ZZZ'], '2021-01-11', '2021-01-21')
+    expected = prices.loc['2021-01-11':'2021-01-20', ['CCC', 'AAA']]
+    pd.testing.assert_frame_equal(df, expected, check_freq=False)
+    # 重新開啟後讀到相同內容
+    pd.testing.assert_frame_equal(PriceStore(str(tmp_path)).load(), prices, check_freq=False)
+
+def test_later_dates_append_without_touching_history(tmp_path, prices, monkeypatch):
+    store = PriceStore(str(tmp_path))
+    store.write(prices.iloc[:30, :3])
+    path = store._price_path('AAA')
+    with open(path, 'rb') as f:
+        head = f.read()
+    calls = _spy(monkeypatch)
+    # 新交易日與新股票 (DDD)：只在檔案尾端 append
+    store.write(prices.iloc[25:])
+    assert calls == ['_append']
+    with open(path, 'rb') as f:
+        assert f.read(len(head)) == head
+    assert os.path.getsize(path) == 40 * 8
+    df = store.load()
+    pd.testing.assert_frame_equal(df[['AAA', 'BBB', 'CCC']], prices[['AAA', 'BBB', 'CCC']], check_freq=False)
+    np.testing.assert_array_equal(df['DDD'].values[25:], prices['DDD'].values[25:])
+    assert df['DDD'].iloc[:25].isna().all()
+
+def test_earlier_dates_rewrite_and_merge(tmp_path, prices, monkeypatch):
+    store = PriceStore(str(tmp_path))
+    store.write(prices.iloc[20:])
+    calls = _spy(monkeypatch)
+    store.write(prices.iloc[:20])
+    assert calls == ['_rewrite']
+    pd.testing.assert_frame_equal(store.load(), prices, check_freq=False)
+
+def test_coverage_merges_adjacent_ranges(tmp_path, prices):
+    store = PriceStore(str(tmp_path))
+    store.write(prices.iloc[:10], '2021-01-01', '2021-01-15')
+    store.write(prices.iloc[10:], '2021-01-15', '2021-03-01')
+    assert store.coverage('AAA') == [(pd.Timestamp('2021-01-01'), pd.Timestamp('2021-03-01'))]
+    assert store.missing_ranges('AAA', '2020-12-01', '2021-04-01') == [
+        (pd.Timestamp('2020-12-01'), pd.Timestamp('2021-01-01')),
+        (pd.Timestamp('2021-03-01'), pd.Timestamp('2021-04-01')),
+    ]
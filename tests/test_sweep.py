@@ -0,0 +1,33 @@
+"""
+參數掃描 (src.sweep)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import factor_returns
+from src.denoise import RMTDenoising
+from src.optimization import MeanVarianceOptimizer, HRPOptimizer
+from src.sweep import ParameterSweep, evaluate_window
+
+@pytest.fixture(scope='module')
+def returns():
+    return factor_returns(n_assets=15, n_days=260, n_factors=2, seed=6)
+
+def test_parallel_sweep_matches_serial(returns):
+    sweep = ParameterSweep(returns, windows=(80, 120), rebalance_freqs=(10, 20),
+                           optimizers=[MeanVarianceOptimizer(), HRPOptimizer(drift_threshold=0.05)])
+    serial = sweep.run()
+    parallel = sweep.run(n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert len(serial) == 2 * 2 * 3 * 2
+
+def test_duplicate_estimators_keep_every_grid_point(returns):
+    sweep = ParameterSweep(returns, windows=(120,), estimators=[RMTDenoising(), RMTDenoising(fit_sigma2=True)])
+    assert list(sweep.estimators) == ['RMTDenoising()', 'RMTDenoising(fit_sigma2=True)']
+
+def test_window_longer_than_data_raises(returns):
+    with pytest.raises(ValueError, match='no rebalance points'):
+        ParameterSweep(returns, windows=(len(returns),)).run()
+    with pytest.raises(ValueError, match='no rebalance points'):
+        evaluate_window(returns.values, len(returns) + 5, returns.index, returns.columns, [21],
+                        ParameterSweep(returns).strategies)